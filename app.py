@@ -6,15 +6,32 @@ A futuristic dashboard for YoLink sensors, task management, and file sharing
 
 import os
 import io
+import atexit
+import calendar
+import glob
 import json
 import hashlib
+import heapq
+import hmac
+import itertools
+import queue
 import secrets
 import time
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime, timedelta
-from functools import wraps
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session, send_from_directory, flash, Response
+from collections import OrderedDict
+from functools import wraps, lru_cache
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, render_template, request, jsonify, redirect, url_for, session, send_from_directory, send_file, flash, Response, after_this_request
+from flask.json.provider import JSONProvider, DefaultJSONProvider
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import MetaData, bindparam, event, exists, select, text, union_all
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import joinedload, selectinload
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
@@ -31,6 +48,17 @@ try:
 except ImportError:
     PDF_AVAILABLE = False
 
+# Graph generation for FDA reports
+try:
+    import matplotlib
+    matplotlib.use('Agg')  # Non-interactive backend
+    import matplotlib.dates as mdates
+    from matplotlib.figure import Figure
+    import numpy as np
+    GRAPHS_AVAILABLE = True
+except ImportError:
+    GRAPHS_AVAILABLE = False
+
 # APNs Push Notification imports
 try:
     import httpx
@@ -47,22 +75,164 @@ try:
 except ImportError:
     FCM_AVAILABLE = False
 
+# Streaming multipart parser for large uploads
+try:
+    from streaming_form_data import StreamingFormDataParser
+    from streaming_form_data.targets import FileTarget
+    STREAMING_UPLOADS_AVAILABLE = True
+except ImportError:
+    STREAMING_UPLOADS_AVAILABLE = False
+
+# HTTP/2 for the EcoFlow/YoLink pollers (httpx only negotiates h2 with the h2 package)
+try:
+    import httpx
+    import h2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Faster JSON encoding for API responses
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Response caching for the public mobile-app endpoints
+try:
+    from flask_caching import Cache
+    CACHE_AVAILABLE = True
+except ImportError:
+    CACHE_AVAILABLE = False
+
+# Cross-process lock so only one gunicorn worker runs the notification job
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
 # Initialize Flask app
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', secrets.token_hex(32))
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///dashboard.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Room for every distinct statement the app issues, so the poll/insert paths
+# always reuse their compiled SQL
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'query_cache_size': 1200}
 app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB max file size
 
 # Ensure upload folder exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+
+class OrJSONProvider(JSONProvider):
+    """jsonify()/request.get_json() backed by orjson.
+
+    Types orjson doesn't know (Decimal, date, ...) fall back to Flask's
+    default encoder.
+    """
+
+    mimetype = 'application/json'
+
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get('sort_keys'):
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=DefaultJSONProvider.default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Hand orjson's bytes straight to the response instead of decoding
+        # them in dumps() only for Werkzeug to encode them again
+        # Same argument rules as jsonify(): one value, several as a list,
+        # keywords as an object, nothing as null
+        obj = args[0] if len(args) == 1 else (args or kwargs or None)
+        body = orjson.dumps(obj, default=DefaultJSONProvider.default, option=orjson.OPT_NON_STR_KEYS)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+if ORJSON_AVAILABLE:
+    app.json = OrJSONProvider(app)
+
 # Initialize extensions
 db = SQLAlchemy(app)
 login_manager = LoginManager(app)
 login_manager.login_view = 'login'
 
+# Public listings are cached for a minute and invalidated on admin writes.
+# Set CACHE_REDIS_URL to share the cache between gunicorn workers; otherwise
+# each worker keeps its own in-process cache.
+PUBLIC_CACHE_TIMEOUT = 60
+if CACHE_AVAILABLE:
+    _cache_redis_url = os.environ.get('CACHE_REDIS_URL')
+    cache = Cache(app, config={
+        'CACHE_TYPE': 'RedisCache' if _cache_redis_url else 'SimpleCache',
+        'CACHE_REDIS_URL': _cache_redis_url,
+        'CACHE_DEFAULT_TIMEOUT': PUBLIC_CACHE_TIMEOUT,
+    })
+else:
+    cache = None
+
+# SQLite tuning - WAL lets dashboard reads proceed while the sensor/EcoFlow
+# pollers write, and synchronous=NORMAL drops the per-commit fsync
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA cache_size=-64000',
+    'PRAGMA busy_timeout=5000',
+)
+
+_db_uri = app.config['SQLALCHEMY_DATABASE_URI']
+if _db_uri.startswith('sqlite:') and ':memory:' not in _db_uri:
+    with app.app_context():
+        @event.listens_for(db.engine, 'connect')
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma in SQLITE_PRAGMAS:
+                cursor.execute(pragma)
+            cursor.close()
+
+# =============================================================================
+# Serialization Helpers
+# =============================================================================
+
+@lru_cache(maxsize=4096)
+def _isoformat(value):
+    return value.isoformat()
+
+
+def isoformat_or_none(value):
+    """ISO-format a datetime for to_dict(), memoized since the same timestamps
+    (created_at, event dates) are re-serialized on every list request"""
+    return _isoformat(value) if value else None
+
+
+def json_bytes(obj):
+    """Compact UTF-8 JSON for a request body sent many times over"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+def json_datetime(value):
+    """A datetime for a to_dict() that is only ever jsonify()'d.
+
+    orjson writes datetimes natively in the same ISO format, so with it the
+    value passes straight through. That skips a per-row isoformat() on the
+    history endpoints, whose timestamps are all unique and would only churn
+    the isoformat_or_none memo.
+    """
+    if ORJSON_AVAILABLE or not value:
+        return value
+    return value.isoformat()
+
+
 # =============================================================================
 # Database Models
 # =============================================================================
@@ -76,7 +246,7 @@ class User(UserMixin, db.Model):
     last_name = db.Column(db.String(80), nullable=True)
     phone = db.Column(db.String(20), nullable=True)
     is_admin = db.Column(db.Boolean, default=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.current_timestamp())
     last_login = db.Column(db.DateTime)
 
     # Relationships
@@ -85,11 +255,16 @@ class User(UserMixin, db.Model):
     files = db.relationship('File', backref='owner', lazy=True)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = generate_password_hash(password, method='scrypt')
 
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
+    @property
+    def password_needs_rehash(self):
+        """Hashes from older Werkzeug versions use slow pbkdf2"""
+        return not self.password_hash.startswith('scrypt:')
+
     @property
     def full_name(self):
         if self.first_name and self.last_name:
@@ -108,8 +283,8 @@ class User(UserMixin, db.Model):
             'full_name': self.full_name,
             'phone': self.phone,
             'is_admin': self.is_admin,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'last_login': self.last_login.isoformat() if self.last_login else None
+            'created_at': isoformat_or_none(self.created_at),
+            'last_login': isoformat_or_none(self.last_login)
         }
 
 
@@ -121,8 +296,8 @@ class Task(db.Model):
     priority = db.Column(db.String(20), default='medium')  # low, medium, high, urgent
     created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     assigned_to = db.Column(db.Integer, db.ForeignKey('user.id'))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.current_timestamp())
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.current_timestamp(), onupdate=datetime.utcnow)
     due_date = db.Column(db.DateTime)
     column_order = db.Column(db.Integer, default=0)
 
@@ -137,22 +312,61 @@ class Task(db.Model):
             'creator_name': self.creator.username if self.creator else None,
             'assigned_to': self.assigned_to,
             'assignee_name': self.assignee.username if self.assignee else None,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'due_date': self.due_date.isoformat() if self.due_date else None,
+            'created_at': isoformat_or_none(self.created_at),
+            'updated_at': isoformat_or_none(self.updated_at),
+            'due_date': isoformat_or_none(self.due_date),
             'column_order': self.column_order
         }
 
+    @staticmethod
+    def dashboard_json():
+        """All tasks as a JSON array string built by SQLite, for the task board.
+
+        Only the fields the board renders are projected, so the creator join
+        and the created/updated timestamps are skipped. Use to_dict() for the
+        full shape. due_date is rewritten to match datetime.isoformat().
+        """
+        sql = """
+            SELECT json_group_array(json_object(
+                'id', t.id,
+                'title', t.title,
+                'description', t.description,
+                'status', t.status,
+                'priority', t.priority,
+                'assigned_to', t.assigned_to,
+                'assignee_name', t.assignee_name,
+                'due_date', replace(replace(t.due_date, ' ', 'T'), '.000000', ''),
+                'column_order', t.column_order
+            ))
+            FROM (
+                SELECT task.id, task.title, task.description, task.status,
+                       task.priority, task.assigned_to, task.due_date,
+                       task.column_order, a.username AS assignee_name
+                FROM task
+                LEFT JOIN "user" AS a ON a.id = task.assigned_to
+                ORDER BY task.column_order
+            ) AS t
+        """
+        return db.session.execute(text(sql)).scalar()
+
 
 # Association table for file sharing
 file_shares = db.Table('file_shares',
     db.Column('file_id', db.Integer, db.ForeignKey('file.id'), primary_key=True),
     db.Column('user_id', db.Integer, db.ForeignKey('user.id'), primary_key=True),
-    db.Column('shared_at', db.DateTime, default=datetime.utcnow)
+    db.Column('shared_at', db.DateTime, default=datetime.utcnow, server_default=db.func.current_timestamp()),
+    # The primary key leads with file_id; "files shared with me" looks up by user
+    db.Index('ix_file_shares_user', 'user_id', 'file_id')
 )
 
 
 class File(db.Model):
+    # /api/files matches owner_id = ? OR is_public OR shared, one index per branch
+    __table_args__ = (
+        db.Index('ix_file_owner', 'owner_id'),
+        db.Index('ix_file_public_owner', 'is_public', 'owner_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     filename = db.Column(db.String(255), nullable=False)
     original_filename = db.Column(db.String(255), nullable=False)
@@ -160,10 +374,11 @@ class File(db.Model):
     mime_type = db.Column(db.String(100))
     owner_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     is_public = db.Column(db.Boolean, default=False)
-    uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
+    content_hash = db.Column(db.String(64))  # BLAKE2b-256 hex, served as the download ETag
+    uploaded_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.current_timestamp())
 
     # Many-to-many relationship for sharing
-    shared_with = db.relationship('User', secondary=file_shares, lazy='subquery',
+    shared_with = db.relationship('User', secondary=file_shares, lazy='selectin',
                                    backref=db.backref('shared_files', lazy=True))
 
     def to_dict(self):
@@ -175,7 +390,7 @@ class File(db.Model):
             'owner_id': self.owner_id,
             'owner_name': self.owner.username if self.owner else None,
             'is_public': self.is_public,
-            'uploaded_at': self.uploaded_at.isoformat() if self.uploaded_at else None,
+            'uploaded_at': isoformat_or_none(self.uploaded_at),
             'shared_with': [u.username for u in self.shared_with]
         }
 
@@ -186,22 +401,52 @@ class YoLinkConfig(db.Model):
     secret_key = db.Column(db.String(255))
     access_token = db.Column(db.Text)
     token_expires = db.Column(db.DateTime)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.current_timestamp(), onupdate=datetime.utcnow)
 
 
 class SensorReading(db.Model):
     """Store sensor readings locally for history charts"""
+    # History queries filter device_id = ? AND recorded_at > ? ORDER BY recorded_at
+    __table_args__ = (db.Index('ix_sensor_device_time', 'device_id', 'recorded_at'),)
+
     id = db.Column(db.Integer, primary_key=True)
-    device_id = db.Column(db.String(100), nullable=False, index=True)
+    device_id = db.Column(db.String(100), nullable=False)
     device_name = db.Column(db.String(255))
     device_type = db.Column(db.String(50))
-    temperature = db.Column(db.Float)
-    humidity = db.Column(db.Float)
+    # Temperature (°C) and humidity (%RH) are stored in tenths. The sensors are
+    # only accurate to ±0.1, and SQLite stores a small integer in 1-2 bytes
+    # versus 8 for a REAL
+    temperature_deci = db.Column(db.SmallInteger)
+    humidity_deci = db.Column(db.SmallInteger)
     battery = db.Column(db.Integer)
     signal = db.Column(db.Integer)
     state = db.Column(db.String(50))
     online = db.Column(db.Boolean, default=True)
-    recorded_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    recorded_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.current_timestamp(), index=True)
+
+    @staticmethod
+    def to_deci(value):
+        """Scale a sensor value to integer tenths for storage"""
+        try:
+            return int(round(float(value) * 10))
+        except (TypeError, ValueError):
+            return None
+
+    @property
+    def temperature(self):
+        return self.temperature_deci / 10.0 if self.temperature_deci is not None else None
+
+    @temperature.setter
+    def temperature(self, value):
+        self.temperature_deci = self.to_deci(value)
+
+    @property
+    def humidity(self):
+        return self.humidity_deci / 10.0 if self.humidity_deci is not None else None
+
+    @humidity.setter
+    def humidity(self, value):
+        self.humidity_deci = self.to_deci(value)
 
     def to_dict(self):
         return {
@@ -215,7 +460,7 @@ class SensorReading(db.Model):
             'signal': self.signal,
             'state': self.state,
             'online': self.online,
-            'recorded_at': self.recorded_at.isoformat() if self.recorded_at else None
+            'recorded_at': json_datetime(self.recorded_at)
         }
 
 
@@ -226,13 +471,15 @@ class EcoFlowConfig(db.Model):
     secret_key = db.Column(db.String(255))
     device_sn = db.Column(db.String(100))  # Device serial number
     device_name = db.Column(db.String(255), default='Delta 2 Max')
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.current_timestamp(), onupdate=datetime.utcnow)
 
 
 class EcoFlowReading(db.Model):
     """Store EcoFlow battery readings for history"""
+    __table_args__ = (db.Index('ix_ecoflow_device_time', 'device_sn', 'recorded_at'),)
+
     id = db.Column(db.Integer, primary_key=True)
-    device_sn = db.Column(db.String(100), nullable=False, index=True)
+    device_sn = db.Column(db.String(100), nullable=False)
     soc = db.Column(db.Integer)  # Battery percentage
     watts_in = db.Column(db.Integer)  # Input power (charging)
     watts_out = db.Column(db.Integer)  # Output power (discharging)
@@ -241,7 +488,7 @@ class EcoFlowReading(db.Model):
     remain_time = db.Column(db.Integer)  # Remaining time in minutes
     battery_temp = db.Column(db.Integer)  # Battery temperature
     solar_in_watts = db.Column(db.Integer)  # Solar input power
-    recorded_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    recorded_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.current_timestamp(), index=True)
 
     def to_dict(self):
         return {
@@ -255,7 +502,7 @@ class EcoFlowReading(db.Model):
             'remain_time': self.remain_time,
             'battery_temp': self.battery_temp,
             'solar_in_watts': self.solar_in_watts,
-            'recorded_at': self.recorded_at.isoformat() if self.recorded_at else None
+            'recorded_at': json_datetime(self.recorded_at)
         }
 
 
@@ -265,7 +512,7 @@ class SquareConfig(db.Model):
     access_token = db.Column(db.String(255))
     location_id = db.Column(db.String(100))
     environment = db.Column(db.String(20), default='production')  # sandbox or production
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.current_timestamp(), onupdate=datetime.utcnow)
 
 
 class AppFlashSale(db.Model):
@@ -277,12 +524,12 @@ class AppFlashSale(db.Model):
     original_price = db.Column(db.Float, nullable=False)
     sale_price = db.Column(db.Float, nullable=False)
     weight_lbs = db.Column(db.Float, default=1.0)
-    starts_at = db.Column(db.DateTime, default=datetime.utcnow)
+    starts_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.current_timestamp())
     expires_at = db.Column(db.DateTime, nullable=False)
     image_system_name = db.Column(db.String(100), default='flame.fill')
     is_active = db.Column(db.Boolean, default=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.current_timestamp())
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.current_timestamp(), onupdate=datetime.utcnow)
 
     def to_dict(self):
         return {
@@ -293,11 +540,11 @@ class AppFlashSale(db.Model):
             'original_price': self.original_price,
             'sale_price': self.sale_price,
             'weight_lbs': self.weight_lbs,
-            'starts_at': self.starts_at.isoformat() if self.starts_at else None,
-            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+            'starts_at': isoformat_or_none(self.starts_at),
+            'expires_at': isoformat_or_none(self.expires_at),
             'image_system_name': self.image_system_name,
             'is_active': self.is_active,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': isoformat_or_none(self.created_at)
         }
 
 
@@ -314,7 +561,7 @@ class PopUpLocation(db.Model):
     is_recurring = db.Column(db.Boolean, default=False)
     recurrence_rule = db.Column(db.String(50))  # e.g. 'weekly_sunday', 'weekly_friday'
     is_active = db.Column(db.Boolean, default=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.current_timestamp())
 
     def to_dict(self):
         return {
@@ -323,8 +570,8 @@ class PopUpLocation(db.Model):
             'location': self.location,
             'latitude': self.latitude,
             'longitude': self.longitude,
-            'date': self.date.isoformat() if self.date else None,
-            'end_date': self.end_date.isoformat() if self.end_date else None,
+            'date': isoformat_or_none(self.date),
+            'end_date': isoformat_or_none(self.end_date),
             'icon': self.icon,
             'is_recurring': self.is_recurring,
             'recurrence_rule': self.recurrence_rule,
@@ -334,6 +581,13 @@ class PopUpLocation(db.Model):
 
 class DeviceToken(db.Model):
     """Push notification device tokens"""
+    # Push broadcasts filter platform = ? AND is_active; registration looks
+    # devices up by device_id (token already has its UNIQUE index)
+    __table_args__ = (
+        db.Index('ix_device_token_platform_active', 'platform', 'is_active'),
+        db.Index('ix_device_token_device_id', 'device_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     token = db.Column(db.String(500), unique=True, nullable=False)
     device_id = db.Column(db.String(100))  # Persistent UUID per device
@@ -347,8 +601,8 @@ class DeviceToken(db.Model):
     locale = db.Column(db.String(20))  # e.g. "en_US"
     timezone = db.Column(db.String(50))  # e.g. "America/New_York"
     is_active = db.Column(db.Boolean, default=True)
-    registered_at = db.Column(db.DateTime, default=datetime.utcnow)
-    last_seen = db.Column(db.DateTime, default=datetime.utcnow)
+    registered_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.current_timestamp())
+    last_seen = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.current_timestamp())
 
 
 class Announcement(db.Model):
@@ -357,8 +611,8 @@ class Announcement(db.Model):
     title = db.Column(db.String(200), nullable=False)
     message = db.Column(db.Text, nullable=False)
     is_active = db.Column(db.Boolean, default=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.current_timestamp())
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.current_timestamp(), onupdate=datetime.utcnow)
 
     def to_dict(self):
         return {
@@ -366,7 +620,7 @@ class Announcement(db.Model):
             'title': self.title,
             'message': self.message,
             'is_active': self.is_active,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'created_at': isoformat_or_none(self.created_at),
         }
 
 
@@ -389,8 +643,8 @@ class Event(db.Model):
     notify = db.Column(db.Boolean, default=True)  # Send automated notifications
     notified_morning = db.Column(db.Boolean, default=False)  # Has 7AM notification been sent
     notified_hour_before = db.Column(db.Boolean, default=False)  # Has 1hr before notification been sent
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.current_timestamp())
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.current_timestamp(), onupdate=datetime.utcnow)
 
     def to_dict(self):
         return {
@@ -400,16 +654,16 @@ class Event(db.Model):
             'location': self.location or '',
             'latitude': self.latitude,
             'longitude': self.longitude,
-            'start_date': self.start_date.isoformat() if self.start_date else None,
-            'end_date': self.end_date.isoformat() if self.end_date else None,
+            'start_date': isoformat_or_none(self.start_date),
+            'end_date': isoformat_or_none(self.end_date),
             'icon': self.icon,
             'is_recurring': self.is_recurring,
             'recurrence_rule': self.recurrence_rule,
-            'recurrence_end_date': self.recurrence_end_date.isoformat() if self.recurrence_end_date else None,
+            'recurrence_end_date': isoformat_or_none(self.recurrence_end_date),
             'is_active': self.is_active,
             'is_popup': self.is_popup if self.is_popup is not None else False,
             'notify': self.notify if self.notify is not None else True,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': isoformat_or_none(self.created_at)
         }
 
     def get_recurring_instances(self, from_date=None, to_date=None):
@@ -422,61 +676,50 @@ class Event(db.Model):
         if to_date is None:
             to_date = from_date + timedelta(days=90)  # Default 3 months ahead
 
-        instances = []
-        current_start = self.start_date
-        event_duration = (self.end_date - self.start_date) if self.end_date else timedelta(hours=4)
-
-        # Determine recurrence interval
-        if self.recurrence_rule == 'weekly':
-            delta = timedelta(weeks=1)
-        elif self.recurrence_rule == 'biweekly':
-            delta = timedelta(weeks=2)
+        # Last start date we can emit
+        until = to_date
+        if self.recurrence_end_date and self.recurrence_end_date < until:
+            until = self.recurrence_end_date
+
+        max_instances = 100  # Safety limit
+
+        if self.recurrence_rule in ('weekly', 'biweekly'):
+            delta = timedelta(weeks=1 if self.recurrence_rule == 'weekly' else 2)
+            # Jump straight to the first occurrence inside the window instead of
+            # stepping forward from the original start date
+            skip = max(0, -((self.start_date - from_date) // delta))
+            first = self.start_date + skip * delta
+            count = (until - first) // delta + 1 if first <= until else 0
+            starts = [first + i * delta for i in range(min(count, max_instances))]
         elif self.recurrence_rule == 'monthly':
-            delta = None  # Handle monthly separately
-        else:
-            return [self.to_dict()]
-
-        # Generate instances
-        max_iterations = 100  # Safety limit
-        iteration = 0
-        while iteration < max_iterations:
-            iteration += 1
-
-            # Check if we've passed the recurrence end date
-            if self.recurrence_end_date and current_start > self.recurrence_end_date:
-                break
-
-            # Check if we've passed our search window
-            if current_start > to_date:
-                break
-
-            # Add instance if it's within our window
-            if current_start >= from_date:
-                instance = self.to_dict()
-                instance['start_date'] = current_start.isoformat()
-                instance['end_date'] = (current_start + event_duration).isoformat() if self.end_date else None
-                instance['instance_id'] = f"{self.id}_{current_start.strftime('%Y%m%d')}"
-                instances.append(instance)
-
-            # Calculate next occurrence
-            if self.recurrence_rule == 'monthly':
+            starts = []
+            current_start = self.start_date
+            for _ in range(max_instances):
+                if current_start > until:
+                    break
+                if current_start >= from_date:
+                    starts.append(current_start)
                 # Add one month
                 month = current_start.month + 1
                 year = current_start.year
                 if month > 12:
                     month = 1
                     year += 1
-                try:
-                    current_start = current_start.replace(year=year, month=month)
-                except ValueError:
-                    # Handle edge cases like Jan 31 -> Feb 28
-                    import calendar
-                    last_day = calendar.monthrange(year, month)[1]
-                    current_start = current_start.replace(year=year, month=month, day=min(current_start.day, last_day))
-            else:
-                current_start += delta
+                # Handle edge cases like Jan 31 -> Feb 28
+                last_day = calendar.monthrange(year, month)[1]
+                current_start = current_start.replace(year=year, month=month, day=min(current_start.day, last_day))
+        else:
+            return [self.to_dict()]
 
-        return instances
+        # Build the shared fields once and only vary the dates per instance
+        base = self.to_dict()
+        event_duration = (self.end_date - self.start_date) if self.end_date else None
+        return [{
+            **base,
+            'start_date': start.isoformat(),
+            'end_date': (start + event_duration).isoformat() if event_duration is not None else None,
+            'instance_id': f"{self.id}_{start.strftime('%Y%m%d')}"
+        } for start in starts]
 
 
 # =============================================================================
@@ -485,13 +728,126 @@ class Event(db.Model):
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # Session.get checks the identity map before issuing a SELECT
+    return db.session.get(User, int(user_id))
+
+
+# Shared pool for fanning out independent upstream API calls within a request
+API_MAX_WORKERS = int(os.environ.get('API_MAX_WORKERS', '8'))
+_api_executor = ThreadPoolExecutor(max_workers=API_MAX_WORKERS)
+
+
+def fan_out(func, items):
+    """Call func(item) for every item on the shared pool; results keep input order"""
+    items = list(items)
+    if len(items) < 2:
+        # Nothing to overlap - skip the thread hop and extra app context
+        return [func(item) for item in items]
+
+    def call(item):
+        with app.app_context():
+            return func(item)
+    return list(_api_executor.map(call, items))
+
+
+def pooled_client(max_connections, retries=0):
+    """Keep-alive HTTP client for one upstream API.
+
+    With httpx/h2 installed, concurrent fan-out calls share a multiplexed
+    HTTP/2 connection; otherwise this is a pooled requests.Session. Both
+    support the get/post/put/request calls the API classes make.
+    """
+    if HTTP2_AVAILABLE:
+        return httpx.Client(transport=httpx.HTTPTransport(
+            http2=True,
+            retries=retries,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        ))
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=max_connections,
+        max_retries=Retry(total=retries, backoff_factor=0.2)
+    ))
+    return session
+
+
+# The keyword pooled_client() clients take a pre-encoded request body under
+POOLED_BODY_ARG = 'content' if HTTP2_AVAILABLE else 'data'
+
+
+# Per-upstream request timeouts in seconds
+HTTP_TIMEOUTS = {
+    'yolink': 30,
+    'ecoflow': 30,
+    'fcm': 30,
+    'apns': 10,
+    'square': 15,
+    'geocode': 10,
+}
+
+# Network-level failures raised by pooled_client() clients
+UPSTREAM_ERRORS = (httpx.HTTPError,) if HTTP2_AVAILABLE else (requests.exceptions.RequestException,)
+
+
+class _SingleFlight:
+    """Short-TTL cache where concurrent misses on one key share a single load"""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._values = {}    # key -> (value, expires_at)
+        self._inflight = {}  # key -> {'done': Event, 'value': ...}
+
+    def get(self, key, loader, cache_if=lambda value: True):
+        with self._lock:
+            entry = self._values.get(key)
+            if entry and entry[1] > time.monotonic():
+                return entry[0]
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = {'done': threading.Event(), 'value': None}
+
+        if not leader:
+            flight['done'].wait()
+            # Fall back to our own load if the leader's raised
+            return flight['value'] if flight['value'] is not None else loader()
+
+        try:
+            value = flight['value'] = loader()
+            if cache_if(value):
+                with self._lock:
+                    self._values[key] = (value, time.monotonic() + self.ttl)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight['done'].set()
+
+    def invalidate(self, key):
+        with self._lock:
+            self._values.pop(key, None)
 
 
 # =============================================================================
 # YoLink API Integration
 # =============================================================================
 
+# In-process YoLink token cache so API calls don't re-read YoLinkConfig each time
+_yl_token_cache = {'token': None, 'expires': None}
+_yl_token_lock = threading.Lock()
+
+# deviceId -> device entry from Home.getDeviceList, so per-device lookups
+# don't refetch the whole list
+YOLINK_DEVICE_INDEX_TTL = 60
+_yolink_device_index = _SingleFlight(YOLINK_DEVICE_INDEX_TTL)
+
+# Pooled keep-alive client so polls reuse the TLS connection to api.yosmart.com
+_yolink_session = pooled_client(16)
+atexit.register(_yolink_session.close)
+
+
 class YoLinkAPI:
     BASE_URL = "https://api.yosmart.com/open/yolink/v2/api"
     TOKEN_URL = "https://api.yosmart.com/open/yolink/token"
@@ -501,40 +857,67 @@ class YoLinkAPI:
         return YoLinkConfig.query.first()
 
     @staticmethod
-    def get_access_token():
-        config = YoLinkAPI.get_config()
-        if not config or not config.uaid or not config.secret_key:
-            return None
+    def _cached_token():
+        token, expires = _yl_token_cache['token'], _yl_token_cache['expires']
+        if token and expires and datetime.utcnow() < expires - timedelta(minutes=5):
+            return token
+        return None
 
-        # Check if token is still valid
-        if config.access_token and config.token_expires:
-            if datetime.utcnow() < config.token_expires - timedelta(minutes=5):
-                return config.access_token
+    @staticmethod
+    def clear_token_cache():
+        _yl_token_cache['token'] = None
+        _yl_token_cache['expires'] = None
 
-        # Get new token
-        try:
-            response = requests.post(
-                YoLinkAPI.TOKEN_URL,
-                headers={'Content-Type': 'application/x-www-form-urlencoded'},
-                data={
-                    'grant_type': 'client_credentials',
-                    'client_id': config.uaid,
-                    'client_secret': config.secret_key
-                },
-                timeout=30
-            )
+    @staticmethod
+    def get_access_token():
+        # Fast path - valid token already in memory, no DB read
+        token = YoLinkAPI._cached_token()
+        if token:
+            return token
+
+        with _yl_token_lock:
+            # Another thread may have refreshed while we waited for the lock
+            token = YoLinkAPI._cached_token()
+            if token:
+                return token
+
+            config = YoLinkAPI.get_config()
+            if not config or not config.uaid or not config.secret_key:
+                return None
+
+            # Check if token stored in the DB is still valid
+            _yl_token_cache['token'] = config.access_token
+            _yl_token_cache['expires'] = config.token_expires
+            token = YoLinkAPI._cached_token()
+            if token:
+                return token
+
+            # Get new token
+            try:
+                response = _yolink_session.post(
+                    YoLinkAPI.TOKEN_URL,
+                    headers={'Content-Type': 'application/x-www-form-urlencoded'},
+                    data={
+                        'grant_type': 'client_credentials',
+                        'client_id': config.uaid,
+                        'client_secret': config.secret_key
+                    },
+                    timeout=HTTP_TIMEOUTS['yolink']
+                )
 
-            if response.status_code == 200:
-                data = response.json()
-                config.access_token = data.get('access_token')
-                expires_in = data.get('expires_in', 7200)
-                config.token_expires = datetime.utcnow() + timedelta(seconds=expires_in)
-                db.session.commit()
-                return config.access_token
-        except Exception as e:
-            print(f"Error getting YoLink token: {e}")
+                if response.status_code == 200:
+                    data = response.json()
+                    config.access_token = data.get('access_token')
+                    expires_in = data.get('expires_in', 7200)
+                    config.token_expires = datetime.utcnow() + timedelta(seconds=expires_in)
+                    db.session.commit()
+                    _yl_token_cache['token'] = config.access_token
+                    _yl_token_cache['expires'] = config.token_expires
+                    return config.access_token
+            except Exception as e:
+                print(f"Error getting YoLink token: {e}")
 
-        return None
+            return None
 
     @staticmethod
     def api_request(method, params=None, target_device=None, device_token=None):
@@ -554,14 +937,14 @@ class YoLinkAPI:
             if params:
                 payload['params'] = params
 
-            response = requests.post(
+            response = _yolink_session.post(
                 YoLinkAPI.BASE_URL,
                 headers={
                     'Content-Type': 'application/json',
                     'Authorization': f'Bearer {token}'
                 },
                 json=payload,
-                timeout=30
+                timeout=HTTP_TIMEOUTS['yolink']
             )
 
             return response.json()
@@ -576,6 +959,16 @@ class YoLinkAPI:
     def get_device_list():
         return YoLinkAPI.api_request('Home.getDeviceList')
 
+    @staticmethod
+    def get_device_index():
+        """{deviceId: device} built from the device list, cached for a minute"""
+        def load():
+            result = YoLinkAPI.get_device_list()
+            devices = (result.get('data') or {}).get('devices') or []
+            return {d.get('deviceId'): d for d in devices}
+
+        return _yolink_device_index.get('devices', load, cache_if=bool)
+
     @staticmethod
     def get_device_state(device_id, device_token, device_type):
         """Get device state using correct YoLink API v2 format.
@@ -594,65 +987,125 @@ class YoLinkAPI:
 # EcoFlow API Integration
 # =============================================================================
 
+# Pooled keep-alive client so dashboard polls reuse the TLS connection to
+# api.ecoflow.com; connection errors get two quick retries
+ECOFLOW_POOL_MAXSIZE = int(os.environ.get('ECOFLOW_POOL_MAXSIZE', '10'))
+_ecoflow_session = pooled_client(ECOFLOW_POOL_MAXSIZE, retries=2)
+atexit.register(_ecoflow_session.close)
+
+# Request signing relies on hmac taking OpenSSL's HMAC path, which only
+# happens when hashlib itself is OpenSSL-backed
+if getattr(hashlib.sha256, '__name__', '') != 'openssl_sha256':
+    print("Warning: hashlib is not backed by OpenSSL - EcoFlow request signing will be slow")
+
+# Full device status per serial number - tabs and widgets polling within a
+# few seconds of each other share one upstream fetch
+ECOFLOW_STATUS_TTL = 10
+_ecoflow_status_cache = _SingleFlight(ECOFLOW_STATUS_TTL)
+
+
+# parse_status results for the last few raw payloads (see parse_status)
+PARSE_STATUS_MEMO_SIZE = 4
+_parse_status_memo = OrderedDict()
+
+
+# Device configs only change from the admin UI, so polls read an in-process
+# copy that is refreshed every ECOFLOW_CONFIG_TTL seconds or on save/delete
+ECOFLOW_CONFIG_TTL = 60
+_ecoflow_config_cache = {'configs': None, 'by_id': {}, 'loaded': 0.0}
+
+# set_quota message ids. time.time() alone repeats when a batch sends several
+# commands within the same second
+_ecoflow_command_ids = itertools.count(int(time.time() * 1000))
+
+
 class EcoFlowAPI:
     """EcoFlow Developer API integration for Delta 2 Max"""
     BASE_URL = "https://api.ecoflow.com/iot-open/sign/device/quota"
 
     @staticmethod
     def get_config():
-        return EcoFlowConfig.query.first()
+        configs = EcoFlowAPI.get_all_configs()
+        return configs[0] if configs else None
 
     @staticmethod
     def get_all_configs():
-        return EcoFlowConfig.query.all()
+        """Return cached config snapshots (plain objects, safe to share across requests)"""
+        cache = _ecoflow_config_cache
+        if cache['configs'] is None or time.monotonic() - cache['loaded'] > ECOFLOW_CONFIG_TTL:
+            columns = [c.name for c in EcoFlowConfig.__table__.columns]
+            cache['configs'] = [
+                SimpleNamespace(**{name: getattr(config, name) for name in columns})
+                for config in EcoFlowConfig.query.order_by(EcoFlowConfig.id).all()
+            ]
+            # Route and form values arrive as strings, so index by str(id)
+            cache['by_id'] = {str(config.id): config for config in cache['configs']}
+            cache['loaded'] = time.monotonic()
+        return cache['configs']
 
     @staticmethod
     def get_config_by_id(config_id):
-        return EcoFlowConfig.query.get(config_id)
+        EcoFlowAPI.get_all_configs()
+        return _ecoflow_config_cache['by_id'].get(str(config_id))
+
+    @staticmethod
+    def invalidate_config():
+        """Drop cached configs after an admin change"""
+        _ecoflow_config_cache['configs'] = None
 
     @staticmethod
     def generate_signature(access_key, secret_key, nonce, timestamp):
         """Generate HMAC signature for EcoFlow API authentication"""
-        import hmac
         # EcoFlow uses a specific signing method
         sign_str = f"accessKey={access_key}&nonce={nonce}&timestamp={timestamp}"
-        signature = hmac.new(
-            secret_key.encode('utf-8'),
-            sign_str.encode('utf-8'),
-            hashlib.sha256
-        ).hexdigest()
-        return signature
+        mac = EcoFlowAPI._hmac_template(secret_key).copy()
+        mac.update(sign_str.encode('utf-8'))
+        return mac.hexdigest()
+
+    @staticmethod
+    def signed_headers(config):
+        """Request headers carrying the HMAC signature for config's keys"""
+        # The millisecond timestamp doubles as the nonce
+        timestamp = str(time.time_ns() // 1_000_000)
+        return {
+            'Content-Type': 'application/json',
+            'accessKey': config.access_key,
+            'nonce': timestamp,
+            'timestamp': timestamp,
+            'sign': EcoFlowAPI.generate_signature(config.access_key, config.secret_key, timestamp, timestamp)
+        }
+
+    @staticmethod
+    @lru_cache(maxsize=16)
+    def _hmac_template(secret_key):
+        """Keyed HMAC state, built once per secret; callers sign on a .copy()"""
+        return hmac.new(secret_key.encode('utf-8'), digestmod=hashlib.sha256)
 
     @staticmethod
     def get_all_quotas(config=None):
-        """Get all device quotas (full status)"""
+        """Get all device quotas (full status), cached briefly per device"""
         if config is None:
             config = EcoFlowAPI.get_config()
         if not config or not config.access_key or not config.secret_key or not config.device_sn:
             return {'error': 'EcoFlow not configured', 'configured': False}
 
-        try:
-            import time
-            nonce = str(int(time.time() * 1000))
-            timestamp = str(int(time.time() * 1000))
-
-            signature = EcoFlowAPI.generate_signature(
-                config.access_key, config.secret_key, nonce, timestamp
-            )
+        return _ecoflow_status_cache.get(
+            config.device_sn,
+            lambda: EcoFlowAPI.fetch_all_quotas(config),
+            cache_if=lambda data: data.get('code') == '0'
+        )
 
-            headers = {
-                'Content-Type': 'application/json',
-                'accessKey': config.access_key,
-                'nonce': nonce,
-                'timestamp': timestamp,
-                'sign': signature
-            }
+    @staticmethod
+    def fetch_all_quotas(config):
+        """Fetch full device status from the EcoFlow API and record a reading"""
+        try:
+            headers = EcoFlowAPI.signed_headers(config)
 
-            response = requests.get(
+            response = _ecoflow_session.get(
                 f"{EcoFlowAPI.BASE_URL}/all",
                 headers=headers,
                 params={'sn': config.device_sn},
-                timeout=30
+                timeout=HTTP_TIMEOUTS['ecoflow']
             )
 
             data = response.json()
@@ -662,7 +1115,7 @@ class EcoFlowAPI:
                 EcoFlowAPI.store_reading(config.device_sn, data['data'])
 
             return data
-        except requests.exceptions.RequestException as e:
+        except UPSTREAM_ERRORS as e:
             return {'error': f'Network error: {str(e)}', 'configured': True}
         except Exception as e:
             return {'error': str(e), 'configured': True}
@@ -676,21 +1129,7 @@ class EcoFlowAPI:
             return {'error': 'EcoFlow not configured', 'configured': False}
 
         try:
-            import time
-            nonce = str(int(time.time() * 1000))
-            timestamp = str(int(time.time() * 1000))
-
-            signature = EcoFlowAPI.generate_signature(
-                config.access_key, config.secret_key, nonce, timestamp
-            )
-
-            headers = {
-                'Content-Type': 'application/json',
-                'accessKey': config.access_key,
-                'nonce': nonce,
-                'timestamp': timestamp,
-                'sign': signature
-            }
+            headers = EcoFlowAPI.signed_headers(config)
 
             payload = {
                 'sn': config.device_sn,
@@ -699,11 +1138,13 @@ class EcoFlowAPI:
                 }
             }
 
-            response = requests.get(
+            # GET with a JSON body - httpx only allows that through request()
+            response = _ecoflow_session.request(
+                'GET',
                 EcoFlowAPI.BASE_URL,
                 headers=headers,
                 json=payload,
-                timeout=30
+                timeout=HTTP_TIMEOUTS['ecoflow']
             )
 
             return response.json()
@@ -719,24 +1160,10 @@ class EcoFlowAPI:
             return {'error': 'EcoFlow not configured', 'configured': False}
 
         try:
-            import time
-            nonce = str(int(time.time() * 1000))
-            timestamp = str(int(time.time() * 1000))
-
-            signature = EcoFlowAPI.generate_signature(
-                config.access_key, config.secret_key, nonce, timestamp
-            )
-
-            headers = {
-                'Content-Type': 'application/json',
-                'accessKey': config.access_key,
-                'nonce': nonce,
-                'timestamp': timestamp,
-                'sign': signature
-            }
+            headers = EcoFlowAPI.signed_headers(config)
 
             payload = {
-                'id': int(time.time()),
+                'id': next(_ecoflow_command_ids),
                 'sn': config.device_sn,
                 'version': '1.0',
                 'moduleType': module_type,
@@ -744,37 +1171,33 @@ class EcoFlowAPI:
                 'params': params
             }
 
-            response = requests.put(
+            response = _ecoflow_session.put(
                 EcoFlowAPI.BASE_URL,
                 headers=headers,
                 json=payload,
-                timeout=30
+                timeout=HTTP_TIMEOUTS['ecoflow']
             )
 
+            # The device state just changed - don't serve the pre-change status
+            _ecoflow_status_cache.invalidate(config.device_sn)
             return response.json()
         except Exception as e:
             return {'error': str(e), 'configured': True}
 
     @staticmethod
     def store_reading(device_sn, data):
-        """Store EcoFlow reading in database"""
-        try:
-            reading = EcoFlowReading(
-                device_sn=device_sn,
-                soc=data.get('pd.soc') or data.get('bms_bmsStatus.soc'),
-                watts_in=data.get('pd.wattsInSum'),
-                watts_out=data.get('pd.wattsOutSum'),
-                ac_out_watts=data.get('inv.outputWatts'),
-                ac_enabled=data.get('inv.cfgAcEnabled') == 1,
-                remain_time=data.get('pd.remainTime'),
-                battery_temp=data.get('bms_bmsStatus.temp'),
-                solar_in_watts=data.get('mppt.inWatts')
-            )
-            db.session.add(reading)
-            db.session.commit()
-        except Exception as e:
-            db.session.rollback()
-            print(f"Error storing EcoFlow reading: {e}")
+        """Queue an EcoFlow reading for the background batch writer"""
+        enqueue_reading(EcoFlowReading, {
+            'device_sn': device_sn,
+            'soc': data.get('pd.soc') or data.get('bms_bmsStatus.soc'),
+            'watts_in': data.get('pd.wattsInSum'),
+            'watts_out': data.get('pd.wattsOutSum'),
+            'ac_out_watts': data.get('inv.outputWatts'),
+            'ac_enabled': data.get('inv.cfgAcEnabled') == 1,
+            'remain_time': data.get('pd.remainTime'),
+            'battery_temp': data.get('bms_bmsStatus.temp'),
+            'solar_in_watts': data.get('mppt.inWatts')
+        })
 
     @staticmethod
     def parse_status(data):
@@ -785,24 +1208,37 @@ class EcoFlowAPI:
         if not data or 'error' in data:
             return data
 
-        raw = data.get('data', data)
+        # Polls inside the status cache TTL hand us the very same dict; the
+        # entry holds a reference to it, so the id() can't be recycled
+        entry = _parse_status_memo.get(id(data))
+        if entry and entry[0] is data:
+            return dict(entry[1])
+
+        parsed = EcoFlowAPI._parse_raw_status(data.get('data', data))
+        _parse_status_memo[id(data)] = (data, parsed)
+        while len(_parse_status_memo) > PARSE_STATUS_MEMO_SIZE:
+            _parse_status_memo.popitem(last=False)
+        # Callers add device fields to the result, so never hand out the cached dict
+        return dict(parsed)
+
+    @staticmethod
+    def _parse_raw_status(raw):
 
-        # Calculate remaining time display
+        # Remaining minutes (positive = until full, negative = until empty);
+        # the dashboard formats it. 5999 means the device is still estimating.
         # Try multiple possible fields for remain time
         remain_time = raw.get('pd.remainTime') or raw.get('bms_bmsStatus.remainTime') or raw.get('bms_emsStatus.dsgRemainTime', 0)
-        if remain_time and remain_time != 5999:
-            hours = abs(remain_time) // 60
-            mins = abs(remain_time) % 60
-            if remain_time > 0:
-                time_display = f"{hours}h {mins}m until full"
-            else:
-                time_display = f"{hours}h {mins}m remaining"
-        else:
-            time_display = "Calculating..."
+        if not remain_time or remain_time == 5999:
+            remain_time = None
+
+        # Fallback fields shared by several outputs - read each once
+        inv_input_watts = raw.get('inv.inputWatts', 0)
+        inv_output_watts = raw.get('inv.outputWatts')
+        car_state = raw.get('pd.carState', 0)
 
         # Determine charging/discharging state
-        watts_in = raw.get('pd.wattsInSum') or raw.get('inv.inputWatts', 0) or 0
-        watts_out = raw.get('pd.wattsOutSum') or raw.get('inv.outputWatts', 0) or 0
+        watts_in = raw.get('pd.wattsInSum') or inv_input_watts or 0
+        watts_out = raw.get('pd.wattsOutSum') or inv_output_watts or 0
         if watts_in > watts_out:
             state = 'charging'
         elif watts_out > 0:
@@ -817,7 +1253,7 @@ class EcoFlowAPI:
         ac_enabled = raw.get('inv.cfgAcEnabled', raw.get('mppt.cfgAcEnabled', 0)) == 1
 
         # AC output watts - try multiple fields
-        ac_output_watts = raw.get('inv.outputWatts') or raw.get('inv.inputWatts', 0) or 0
+        ac_output_watts = inv_output_watts or inv_input_watts or 0
 
         # X-Boost - Delta uses inv.cfgAcXboost, River uses mppt.cfgAcXboost
         ac_xboost = raw.get('inv.cfgAcXboost', raw.get('mppt.cfgAcXboost', 0)) == 1
@@ -837,17 +1273,16 @@ class EcoFlowAPI:
             'watts_out': watts_out,
             'state': state,
             'remain_time': remain_time,
-            'remain_time_display': time_display,
             'ac_enabled': ac_enabled,
             'ac_output_watts': ac_output_watts,
             'ac_xboost': ac_xboost,
-            'dc_enabled': raw.get('pd.dcOutState', raw.get('pd.carState', 0)) == 1,
+            'dc_enabled': raw.get('pd.dcOutState', car_state) == 1,
             'battery_temp': battery_temp,
             'inv_temp': raw.get('inv.outTemp'),
             'solar_in_watts': solar_in_watts,
             'solar_in_volts': solar_in_vol / 10 if solar_in_vol else 0,
             'car_out_watts': raw.get('mppt.carOutWatts') or raw.get('pd.carWatts', 0) or 0,
-            'car_state': raw.get('mppt.carState', raw.get('pd.carState', 0)) == 1,
+            'car_state': raw.get('mppt.carState', car_state) == 1,
             'beep_mode': raw.get('pd.beepMode', 0) == 0,  # 0 = normal, 1 = mute
             'brightness': raw.get('pd.brightLevel', 3),
             'standby_min': raw.get('pd.standbyMin', 0),
@@ -877,6 +1312,36 @@ def index():
     return redirect(url_for('login'))
 
 
+def record_last_login(user_id):
+    """Stamp last_login after the login response has been sent.
+
+    The timestamp is informational, so the user shouldn't wait on its commit.
+    """
+    logged_in_at = datetime.utcnow()
+
+    def update():
+        with app.app_context():
+            try:
+                db.session.execute(
+                    db.update(User).where(User.id == user_id).values(last_login=logged_in_at)
+                )
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Error recording last login for user {user_id}: {e}")
+
+    @after_this_request
+    def defer_update(response):
+        response.call_on_close(update)
+        return response
+
+
+@lru_cache(maxsize=1)
+def dummy_password_hash():
+    """Hash of a random password, checked against when a login names no account"""
+    return generate_password_hash(secrets.token_hex(16), method='scrypt')
+
+
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     if current_user.is_authenticated:
@@ -887,15 +1352,24 @@ def login():
         login_id = data.get('username')  # Can be username or email
         password = data.get('password')
 
-        # Try to find user by username or email
-        user = User.query.filter_by(username=login_id).first()
-        if not user:
-            user = User.query.filter_by(email=login_id).first()
+        # Find user by username or email in one query (a username match wins)
+        user = User.query.filter(
+            db.or_(User.username == login_id, User.email == login_id)
+        ).order_by((User.username == login_id).desc()).first()
 
-        if user and user.check_password(password):
-            user.last_login = datetime.utcnow()
-            db.session.commit()
+        if user:
+            password_ok = user.check_password(password)
+        else:
+            # Hash anyway so response time doesn't reveal which accounts exist
+            check_password_hash(dummy_password_hash(), password or '')
+            password_ok = False
+
+        if password_ok:
+            if user.password_needs_rehash:
+                user.set_password(password)
+                db.session.commit()
             login_user(user)
+            record_last_login(user.id)
 
             if request.is_json:
                 return jsonify({'success': True, 'redirect': url_for('dashboard')})
@@ -968,16 +1442,25 @@ def get_users():
     if not current_user.is_admin:
         return jsonify({'error': 'Unauthorized'}), 403
 
-    users = User.query.all()
-    return jsonify([u.to_dict() for u in users])
+    query = User.query.order_by(User.id)
+    page = request.args.get('page', type=int)
+    if page is None:
+        return jsonify([u.to_dict() for u in query])
+
+    # Paged callers get the same array shape, with the total in a header
+    per_page = min(request.args.get('per_page', 50, type=int), 200)
+    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    response = jsonify([u.to_dict() for u in pagination.items])
+    response.headers['X-Total-Count'] = str(pagination.total)
+    return response
 
 
 @app.route('/api/users/list', methods=['GET'])
 @login_required
 def get_users_list():
     """Get list of users for task assignment"""
-    users = User.query.all()
-    return jsonify([{'id': u.id, 'username': u.username} for u in users])
+    rows = db.session.execute(select(User.id, User.username).order_by(User.id))
+    return jsonify([{'id': user_id, 'username': username} for user_id, username in rows])
 
 
 @app.route('/api/users/<int:user_id>', methods=['DELETE'])
@@ -1070,8 +1553,7 @@ def toggle_admin(user_id):
 @app.route('/api/tasks', methods=['GET'])
 @login_required
 def get_tasks():
-    tasks = Task.query.order_by(Task.column_order).all()
-    return jsonify([t.to_dict() for t in tasks])
+    return Response(Task.dashboard_json(), mimetype='application/json')
 
 
 @app.route('/api/tasks', methods=['POST'])
@@ -1137,21 +1619,37 @@ def delete_task(task_id):
 
 ALLOWED_EXTENSIONS = {'txt', 'pdf', 'png', 'jpg', 'jpeg', 'gif', 'doc', 'docx', 'xls', 'xlsx', 'csv', 'zip'}
 
+_ALLOWED_SUFFIXES = tuple('.' + ext for ext in ALLOWED_EXTENSIONS)
+
 def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return filename.lower().endswith(_ALLOWED_SUFFIXES)
 
 
 @app.route('/api/files', methods=['GET'])
 @login_required
 def get_files():
-    # Get user's own files
-    own_files = File.query.filter_by(owner_id=current_user.id).all()
-
-    # Get files shared with user
-    shared_files = current_user.shared_files
+    # Only owner/sharee usernames are serialized, so don't hydrate full User rows
+    username_opts = (
+        joinedload(File.owner).load_only(User.username),
+        selectinload(File.shared_with).load_only(User.username)
+    )
 
-    # Get public files
-    public_files = File.query.filter_by(is_public=True).filter(File.owner_id != current_user.id).all()
+    # One query for every file the user can see, then bucket in Python
+    shared_ids = select(file_shares.c.file_id).where(file_shares.c.user_id == current_user.id)
+    files = File.query.filter(db.or_(
+        File.owner_id == current_user.id,
+        File.is_public == True,
+        File.id.in_(shared_ids)
+    )).options(*username_opts).order_by(File.id).all()
+
+    own_files, shared_files, public_files = [], [], []
+    for f in files:
+        if f.owner_id == current_user.id:
+            own_files.append(f)
+        if any(u.id == current_user.id for u in f.shared_with):
+            shared_files.append(f)
+        if f.is_public and f.owner_id != current_user.id:
+            public_files.append(f)
 
     return jsonify({
         'own_files': [f.to_dict() for f in own_files],
@@ -1160,40 +1658,127 @@ def get_files():
     })
 
 
-@app.route('/api/files/upload', methods=['POST'])
-@login_required
-def upload_file():
-    if 'file' not in request.files:
-        return jsonify({'error': 'No file provided'}), 400
+UPLOAD_CHUNK_SIZE = 256 * 1024
+SAVE_CHUNK_SIZE = 1024 * 1024
 
-    file = request.files['file']
 
-    if file.filename == '':
-        return jsonify({'error': 'No file selected'}), 400
+def new_content_hash():
+    """Hasher for File.content_hash (BLAKE2b-256)"""
+    return hashlib.blake2b(digest_size=32)
 
-    if file and allowed_file(file.filename):
-        original_filename = secure_filename(file.filename)
-        # Create unique filename
-        unique_filename = f"{secrets.token_hex(16)}_{original_filename}"
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-        file.save(filepath)
 
-        file_size = os.path.getsize(filepath)
+if STREAMING_UPLOADS_AVAILABLE:
+    class HashingFileTarget(FileTarget):
+        """FileTarget that hashes and counts the bytes as it writes them"""
 
-        new_file = File(
-            filename=unique_filename,
-            original_filename=original_filename,
-            file_size=file_size,
-            mime_type=file.content_type,
-            owner_id=current_user.id
-        )
+        def __init__(self, filename):
+            super().__init__(filename)
+            self.hasher = new_content_hash()
+            self.size = 0
 
-        db.session.add(new_file)
-        db.session.commit()
+        def on_data_received(self, chunk):
+            super().on_data_received(chunk)
+            self.hasher.update(chunk)
+            self.size += len(chunk)
 
-        return jsonify({'success': True, 'file': new_file.to_dict()})
 
-    return jsonify({'error': 'File type not allowed'}), 400
+def stream_upload_to_disk(dest_dir):
+    """Stream the multipart 'file' field straight to a temp file in dest_dir.
+
+    Avoids Werkzeug spooling the upload to a temporary file and then copying
+    it again on save(). Returns (filename, content_type, temp_path, size,
+    content_hash); filename is None when the request had no 'file' field.
+    """
+    temp_path = os.path.join(dest_dir, f"{secrets.token_hex(16)}.part")
+    target = HashingFileTarget(temp_path)
+    parser = StreamingFormDataParser(headers=request.headers)
+    parser.register('file', target)
+
+    try:
+        while True:
+            chunk = request.stream.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            parser.data_received(chunk)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return (target.multipart_filename, target.multipart_content_type, temp_path,
+            target.size, target.hasher.hexdigest())
+
+
+def unique_upload_name(original_filename):
+    """Stored name for a new upload, relative to UPLOAD_FOLDER.
+
+    Files go in per-month subdirectories (YYYY/MM) so no single directory
+    grows without bound, and the name leads with the upload time in hex so
+    recent files sort and cluster together. Older uploads stored flat at the
+    top level keep working since File.filename holds the relative path.
+    """
+    now = datetime.utcnow()
+    shard = f"{now:%Y}/{now:%m}"
+    os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], shard), exist_ok=True)
+    return f"{shard}/{time.time_ns():016x}{secrets.token_hex(6)}_{original_filename}"
+
+
+def save_upload_stream(stream, path):
+    """Copy an upload stream to path in 1 MiB chunks; returns (size, content_hash)"""
+    hasher = new_content_hash()
+    size = 0
+    with open(path, 'wb') as dst:
+        while chunk := stream.read(SAVE_CHUNK_SIZE):
+            dst.write(chunk)
+            hasher.update(chunk)
+            size += len(chunk)
+    return size, hasher.hexdigest()
+
+
+@app.route('/api/files/upload', methods=['POST'])
+@login_required
+def upload_file():
+    file = None
+    temp_path = None
+    if STREAMING_UPLOADS_AVAILABLE and request.mimetype == 'multipart/form-data':
+        filename, content_type, temp_path, file_size, content_hash = stream_upload_to_disk(app.config['UPLOAD_FOLDER'])
+    else:
+        file = request.files.get('file')
+        filename = file.filename if file is not None else None
+        content_type = file.content_type if file is not None else None
+
+    if not filename or not allowed_file(filename):
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+        if filename is None:
+            return jsonify({'error': 'No file provided'}), 400
+        if filename == '':
+            return jsonify({'error': 'No file selected'}), 400
+        return jsonify({'error': 'File type not allowed'}), 400
+
+    original_filename = secure_filename(filename)
+    unique_filename = unique_upload_name(original_filename)
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
+    # Size and content hash are computed while the bytes are written, so the
+    # stored file is never re-read or stat'd
+    if temp_path:
+        os.replace(temp_path, filepath)
+    else:
+        file_size, content_hash = save_upload_stream(file.stream, filepath)
+
+    new_file = File(
+        filename=unique_filename,
+        original_filename=original_filename,
+        file_size=file_size,
+        mime_type=content_type,
+        owner_id=current_user.id,
+        content_hash=content_hash
+    )
+
+    db.session.add(new_file)
+    db.session.commit()
+
+    return jsonify({'success': True, 'file': new_file.to_dict()})
 
 
 @app.route('/api/files/<int:file_id>/download')
@@ -1209,7 +1794,10 @@ def download_file(file_id):
         app.config['UPLOAD_FOLDER'],
         file.filename,
         as_attachment=True,
-        download_name=file.original_filename
+        download_name=file.original_filename,
+        # Stored content hash gives clients a stable ETag for conditional GETs;
+        # older uploads fall back to Flask's mtime/size ETag
+        etag=file.content_hash or True
     )
 
 
@@ -1224,12 +1812,20 @@ def share_file(file_id):
     data = request.get_json()
     user_ids = data.get('user_ids', [])
 
-    for user_id in user_ids:
-        user = User.query.get(user_id)
-        if user and user not in file.shared_with:
-            file.shared_with.append(user)
-
-    db.session.commit()
+    # shared_with is selectin-loaded with the file, so this costs no query
+    existing = {u.id for u in file.shared_with}
+    new_ids = []
+    if user_ids:
+        new_ids = db.session.execute(
+            select(User.id).where(User.id.in_(user_ids)).order_by(User.id)
+        ).scalars().all()
+        new_ids = [user_id for user_id in new_ids if user_id not in existing]
+
+    if new_ids:
+        db.session.execute(file_shares.insert(), [
+            {'file_id': file.id, 'user_id': user_id} for user_id in new_ids
+        ])
+        db.session.commit()
 
     return jsonify({'success': True, 'file': file.to_dict()})
 
@@ -1306,6 +1902,7 @@ def set_yolink_config():
     config.token_expires = None
 
     db.session.commit()
+    YoLinkAPI.clear_token_cache()
 
     return jsonify({'success': True, 'message': 'YoLink configuration saved'})
 
@@ -1323,16 +1920,20 @@ def get_yolink_devices():
     if result.get('data') and result['data'].get('devices'):
         devices = result['data']['devices']
         enhanced_devices = []
+        pending_readings = []
+
+        # Fetch every device's current state concurrently
+        state_results = fan_out(
+            lambda d: YoLinkAPI.get_device_state(d.get('deviceId'), d.get('token'), d.get('type', 'THSensor')),
+            devices
+        )
 
-        for device in devices:
+        for device, state_result in zip(devices, state_results):
             device_id = device.get('deviceId')
             device_token = device.get('token')
             device_type = device.get('type', 'THSensor')
             device_name = device.get('name', 'Unknown')
 
-            # Fetch current state for each device
-            state_result = YoLinkAPI.get_device_state(device_id, device_token, device_type)
-
             device_info = {
                 'deviceId': device_id,
                 'token': device_token,
@@ -1363,11 +1964,12 @@ def get_yolink_devices():
                 if report_at:
                     device_info['reportAt'] = report_at
 
-                # Store reading in database for history
-                store_sensor_reading(device_id, device_name, device_type, state)
+                # Queue reading for history (written once per poll cycle below)
+                pending_readings.append(build_sensor_reading(device_id, device_name, device_type, state))
 
             enhanced_devices.append(device_info)
 
+        record_sensor_readings(pending_readings)
         result['data']['devices'] = enhanced_devices
 
     return jsonify(result)
@@ -1385,13 +1987,10 @@ def debug_device(device_id):
 
     if not device_token:
         # Try to find the device in the device list
-        device_list = YoLinkAPI.get_device_list()
-        if device_list.get('data') and device_list['data'].get('devices'):
-            for d in device_list['data']['devices']:
-                if d.get('deviceId') == device_id:
-                    device_token = d.get('token')
-                    device_type = d.get('type', device_type)
-                    break
+        device = YoLinkAPI.get_device_index().get(device_id)
+        if device:
+            device_token = device.get('token')
+            device_type = device.get('type', device_type)
 
     if not device_token:
         return jsonify({'error': 'Device not found or token not provided'}), 404
@@ -1423,13 +2022,17 @@ def debug_all_devices():
     }
 
     if device_list.get('data') and device_list['data'].get('devices'):
-        for device in device_list['data']['devices']:
+        devices = device_list['data']['devices']
+        state_results = fan_out(
+            lambda d: YoLinkAPI.get_device_state(d.get('deviceId'), d.get('token'), d.get('type', 'THSensor')),
+            devices
+        )
+
+        for device, state_result in zip(devices, state_results):
             device_id = device.get('deviceId')
             device_token = device.get('token')
             device_type = device.get('type', 'THSensor')
 
-            state_result = YoLinkAPI.get_device_state(device_id, device_token, device_type)
-
             debug_info['devices_detail'].append({
                 'device_id': device_id,
                 'name': device.get('name'),
@@ -1441,36 +2044,344 @@ def debug_all_devices():
     return jsonify(debug_info)
 
 
-def store_sensor_reading(device_id, device_name, device_type, state):
-    """Store a sensor reading for history tracking"""
-    try:
-        # Check if we already have a recent reading (within 5 minutes)
-        recent = SensorReading.query.filter(
-            SensorReading.device_id == device_id,
-            SensorReading.recorded_at > datetime.utcnow() - timedelta(minutes=5)
-        ).first()
+def build_sensor_reading(device_id, device_name, device_type, state):
+    """Build a SensorReading row mapping from a YoLink device state"""
+    return {
+        'device_id': device_id,
+        'device_name': device_name,
+        'device_type': device_type,
+        'temperature_deci': SensorReading.to_deci(state.get('temperature')),
+        'humidity_deci': SensorReading.to_deci(state.get('humidity')),
+        'battery': state.get('battery'),
+        'signal': state.get('loraInfo', {}).get('signal') if isinstance(state.get('loraInfo'), dict) else None,
+        'state': state.get('state') or state.get('alertType'),
+        'online': state.get('online', True)
+    }
 
-        if recent:
-            return  # Skip if recent reading exists
 
-        reading = SensorReading(
-            device_id=device_id,
-            device_name=device_name,
-            device_type=device_type,
-            temperature=state.get('temperature'),
-            humidity=state.get('humidity'),
-            battery=state.get('battery'),
-            signal=state.get('loraInfo', {}).get('signal') if isinstance(state.get('loraInfo'), dict) else None,
-            state=state.get('state') or state.get('alertType'),
-            online=state.get('online', True)
+SENSOR_READING_INTERVAL = timedelta(minutes=5)  # at most one stored reading per device per interval
+
+
+@lru_cache(maxsize=4)
+def _dedupe_sensor_insert(columns):
+    """INSERT ... SELECT :values WHERE NOT EXISTS (a reading newer than :cutoff)"""
+    table = SensorReading.__table__
+    values = select(*(bindparam(name, type_=table.c[name].type) for name in columns)).where(
+        ~exists().where(
+            table.c.device_id == bindparam('device_id'),
+            table.c.recorded_at > bindparam('cutoff', type_=table.c.recorded_at.type)
         )
-        db.session.add(reading)
+    )
+    return table.insert().from_select(list(columns), values)
+
+
+def record_sensor_readings(readings):
+    """Store a poll cycle's sensor readings, skipping devices recorded within the interval.
+
+    The recency check runs inside each INSERT, so the whole cycle is one
+    executemany and one commit, and two workers polling at once can't both
+    store a reading for the same device.
+    """
+    if not readings:
+        return
+    recorded_at = datetime.utcnow()
+    cutoff = recorded_at - SENSOR_READING_INTERVAL
+    for reading in readings:
+        reading.setdefault('recorded_at', recorded_at)
+        reading['cutoff'] = cutoff
+    columns = tuple(name for name in readings[0] if name != 'cutoff')
+    try:
+        db.session.execute(_dedupe_sensor_insert(columns), readings)
         db.session.commit()
     except Exception as e:
-        print(f"Error storing sensor reading: {e}")
+        print(f"Error storing SensorReading batch: {e}")
         db.session.rollback()
 
 
+def bulk_record_readings(readings, model=SensorReading):
+    """Insert a poll cycle's readings in a single transaction (one fsync, not N)"""
+    if not readings:
+        return
+    # Stamp the whole batch once rather than running the column default per row
+    recorded_at = datetime.utcnow()
+    for reading in readings:
+        reading.setdefault('recorded_at', recorded_at)
+    try:
+        # Core insert with a list of rows runs as one cached executemany,
+        # skipping ORM unit-of-work bookkeeping entirely
+        db.session.execute(model.__table__.insert(), readings)
+        db.session.commit()
+    except Exception as e:
+        print(f"Error storing {model.__name__} batch: {e}")
+        db.session.rollback()
+
+
+# Background batch writer - pollers queue rows here so the HTTP response never
+# waits on a commit; a daemon thread writes up to READING_BATCH_SIZE rows at a
+# time, at most READING_FLUSH_INTERVAL seconds after the first one arrived
+READING_BATCH_SIZE = 50
+READING_FLUSH_INTERVAL = 5  # seconds
+
+_reading_queue = queue.Queue()
+_reading_writer = None
+_reading_writer_lock = threading.Lock()
+
+
+def enqueue_reading(model, reading):
+    """Queue one reading row for the background writer"""
+    global _reading_writer
+    reading.setdefault('recorded_at', datetime.utcnow())
+    _reading_queue.put_nowait((model, reading))
+
+    if _reading_writer is None:
+        with _reading_writer_lock:
+            if _reading_writer is None:
+                _reading_writer = threading.Thread(target=_reading_writer_loop, daemon=True)
+                _reading_writer.start()
+
+
+def write_reading_batch(batch):
+    """Insert queued (model, reading) pairs, one executemany per model"""
+    by_model = {}
+    for model, reading in batch:
+        by_model.setdefault(model, []).append(reading)
+    with app.app_context():
+        for model, readings in by_model.items():
+            bulk_record_readings(readings, model=model)
+
+
+def flush_pending_readings():
+    """Write everything still sitting in the queue (used at shutdown)"""
+    batch = []
+    while True:
+        try:
+            batch.append(_reading_queue.get_nowait())
+        except queue.Empty:
+            break
+    if batch:
+        write_reading_batch(batch)
+
+
+def _reading_writer_loop():
+    while True:
+        batch = [_reading_queue.get()]
+        deadline = time.monotonic() + READING_FLUSH_INTERVAL
+        while len(batch) < READING_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_reading_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        try:
+            write_reading_batch(batch)
+        except Exception as e:
+            print(f"Error writing reading batch: {e}")
+
+
+atexit.register(flush_pending_readings)
+
+# =============================================================================
+# Background Jobs
+# =============================================================================
+
+class _ExclusiveJob:
+    """A periodic job run by exactly one gunicorn worker.
+
+    Each worker starts the job's daemon thread on its first request (so it
+    runs in the serving workers rather than at import), but only the thread
+    holding instance/<name>.lock runs the job; if that worker exits, another
+    takes the lock on its next pass.
+    """
+
+    def __init__(self, name, interval, job):
+        self.name = name
+        self.interval = interval
+        self.job = job
+        self.lock_path = os.path.join(app.instance_path, f'{name}.lock')
+        self.thread = None
+        self._start_lock = threading.Lock()
+
+    def acquire(self):
+        """Open file holding the job's lock, or None if another process has it"""
+        if not FCNTL_AVAILABLE:
+            return True
+        os.makedirs(app.instance_path, exist_ok=True)
+        lock_file = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return None
+        return lock_file
+
+    def _loop(self):
+        lock_file = None
+        while True:
+            if lock_file is None:
+                lock_file = self.acquire()
+            if lock_file is not None:
+                with app.app_context():
+                    try:
+                        self.job()
+                    except Exception as e:
+                        print(f"Error running {self.name} job: {e}")
+                    finally:
+                        db.session.remove()
+            time.sleep(self.interval)
+
+    def start(self):
+        if self.thread is None:
+            with self._start_lock:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self._loop, daemon=True)
+                    self.thread.start()
+
+
+# =============================================================================
+# Reading Archive
+# =============================================================================
+# Readings from before the current month are moved out of the live tables into
+# one SQLite file per month (instance/readings_YYYYMM.db). The live tables stay
+# small for the poll/history hot path; history queries that reach back past the
+# start of the month read the matching archive files as well.
+
+READING_MODELS = (SensorReading, EcoFlowReading)
+ARCHIVE_CHECK_INTERVAL = 6 * 3600  # seconds between archive sweeps
+# Rows moved per transaction, so the pollers' writes never wait out busy_timeout
+ARCHIVE_BATCH_SIZE = 5000
+
+_archive_metadata = MetaData()
+ARCHIVE_TABLES = {
+    model: model.__table__.to_metadata(_archive_metadata, schema='archive')
+    for model in READING_MODELS
+}
+
+
+def month_start(value):
+    """Return midnight on the first day of value's month"""
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def archive_path(month):
+    """Path of the archive database holding readings for the given month"""
+    return os.path.join(app.instance_path, f"readings_{month:%Y%m}.db")
+
+
+def archive_paths_since(since):
+    """Existing archive databases covering since up to the start of this month"""
+    current = month_start(datetime.utcnow())
+    month = month_start(since)
+    paths = []
+    while month < current:
+        path = archive_path(month)
+        if os.path.exists(path):
+            paths.append(path)
+        month = (month + timedelta(days=32)).replace(day=1)
+    return paths
+
+
+def archive_old_readings():
+    """Move readings recorded before the current month into monthly archive databases.
+
+    Rows move ARCHIVE_BATCH_SIZE at a time, one short transaction each. The
+    newest row always stays in the live table: ids are plain rowids, so an
+    emptied table would hand out ids the archives already hold.
+    """
+    cutoff = month_start(datetime.utcnow())
+    moved = 0
+    os.makedirs(app.instance_path, exist_ok=True)
+
+    with db.engine.connect() as conn:
+        for model in READING_MODELS:
+            live = model.__table__
+            archived = ARCHIVE_TABLES[model]
+            newest_id = conn.execute(select(db.func.max(live.c.id))).scalar()
+            months = conn.execute(
+                select(db.func.strftime('%Y-%m-01', live.c.recorded_at)).distinct()
+                .where(live.c.recorded_at < cutoff)
+            ).scalars().all()
+            conn.commit()
+
+            for month_str in months:
+                month = datetime.strptime(month_str, '%Y-%m-%d')
+                next_month = (month + timedelta(days=32)).replace(day=1)
+                in_month = (live.c.recorded_at >= month) & (live.c.recorded_at < next_month) & (live.c.id < newest_id)
+                batch = live.c.id.in_(
+                    select(live.c.id).where(in_month).order_by(live.c.id).limit(ARCHIVE_BATCH_SIZE)
+                )
+
+                conn.exec_driver_sql('ATTACH DATABASE ? AS archive', (archive_path(month),))
+                try:
+                    # Create both tables so readers can query any archive file uniformly
+                    _archive_metadata.create_all(conn)
+                    conn.commit()
+                    while True:
+                        try:
+                            result = conn.execute(archived.insert().from_select(
+                                [c.name for c in live.columns], select(live).where(batch)
+                            ))
+                            conn.execute(live.delete().where(batch))
+                            conn.commit()
+                        except Exception:
+                            conn.rollback()
+                            raise
+                        moved += result.rowcount
+                        if result.rowcount < ARCHIVE_BATCH_SIZE:
+                            break
+                finally:
+                    conn.exec_driver_sql('DETACH DATABASE archive')
+
+    if moved:
+        print(f"Archived {moved} readings from before {cutoff:%Y-%m}")
+    return moved
+
+
+def execute_on_readings(model, since, build):
+    """Run build(table) on the live table and every archive covering since.
+
+    Returns (rows, merged) where rows concatenates each source's results and
+    merged is True when any archive contributed, i.e. when the caller has to
+    combine per-source ordering, limits or aggregates itself.
+    """
+    paths = archive_paths_since(since)
+    with db.engine.connect() as conn:
+        rows = conn.execute(build(model.__table__)).all()
+        for path in paths:
+            conn.exec_driver_sql('ATTACH DATABASE ? AS archive', (path,))
+            try:
+                rows.extend(conn.execute(build(ARCHIVE_TABLES[model])).all())
+            finally:
+                conn.exec_driver_sql('DETACH DATABASE archive')
+    return rows, bool(paths)
+
+
+def query_readings(model, since, order_by=('recorded_at',), limit=None, **filters):
+    """Readings recorded after since, from the live table plus any monthly archives.
+
+    filters are column == value equality tests. Rows come back as transient
+    model instances so callers can keep using to_dict().
+    """
+    def build(table):
+        stmt = select(table).where(
+            table.c.recorded_at > since,
+            *(table.c[name] == value for name, value in filters.items())
+        ).order_by(*(table.c[name] for name in order_by))
+        return stmt.limit(limit) if limit else stmt
+
+    rows, merged = execute_on_readings(model, since, build)
+    if merged:
+        # SQLite sorts NULLs first; mirror that when merging the sources
+        rows.sort(key=lambda row: tuple((row._mapping[name] is not None, row._mapping[name]) for name in order_by))
+        if limit:
+            rows = rows[:limit]
+    return [model(**row._mapping) for row in rows]
+
+
+_archive_job = _ExclusiveJob('archive', ARCHIVE_CHECK_INTERVAL, archive_old_readings)
+
+
 @app.route('/api/yolink/home', methods=['GET'])
 @login_required
 def get_yolink_home():
@@ -1491,6 +2402,102 @@ def get_device_state_route(device_id):
     return jsonify(result)
 
 
+def readings_etag(model, since, variant, **filters):
+    """ETag for a history window from its newest timestamp and row count.
+
+    Costs one indexed aggregate per source instead of loading the rows.
+    variant folds in any request options that change the response body.
+    """
+    def build(table):
+        return select(db.func.max(table.c.recorded_at), db.func.count()).where(
+            table.c.recorded_at > since,
+            *(table.c[name] == value for name, value in filters.items())
+        )
+
+    rows, _ = execute_on_readings(model, since, build)
+    newest = max((row[0] for row in rows if row[0] is not None), default=None)
+    count = sum(row[1] for row in rows)
+    key = f"{model.__tablename__}:{variant}:{sorted(filters.items())}:{newest}:{count}"
+    return hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+
+
+def conditional_json(etag, build):
+    """Answer 304 when If-None-Match carries etag, otherwise jsonify(build())"""
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag)
+    # Let the browser keep the body but revalidate on every poll
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def lttb_indices(xs, ys, threshold):
+    """Indices Largest-Triangle-Three-Buckets keeps when thinning a series to threshold points.
+
+    The first and last points are always kept. Each bucket in between keeps the
+    point forming the largest triangle with the previous pick and the next
+    bucket's average, so peaks and dips survive the reduction.
+    """
+    n = len(xs)
+    if threshold >= n:
+        return list(range(n))
+    if threshold < 3:
+        return [0, n - 1][:max(threshold, 0)]
+
+    every = (n - 2) / (threshold - 2)
+    kept = [0]
+    prev = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = sum(xs[end:next_end]) / (next_end - end)
+        avg_y = sum(ys[end:next_end]) / (next_end - end)
+        px, py = xs[prev], ys[prev]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((px - avg_x) * (ys[j] - py) - (px - xs[j]) * (avg_y - py))
+            if area > best_area:
+                best, best_area = j, area
+        kept.append(best)
+        prev = best
+    kept.append(n - 1)
+    return kept
+
+
+def downsample_readings(readings, limit, value, group=None):
+    """Thin time-ordered readings to limit rows with LTTB on value(reading).
+
+    Readings where value is None reuse the previous value so they don't
+    distort the triangles. With group, each group(reading) series (e.g. one
+    per device) is thinned on its own, to a share of limit proportional to
+    its size, and the results are merged back into time order.
+    """
+    if len(readings) <= limit:
+        return readings
+    if group is not None:
+        series = {}
+        for reading in readings:
+            series.setdefault(group(reading), []).append(reading)
+        if len(series) > 1:
+            total = len(readings)
+            return list(heapq.merge(
+                *(downsample_readings(rows, max(1, limit * len(rows) // total), value)
+                  for rows in series.values()),
+                key=lambda r: r.recorded_at
+            ))
+    xs, ys, last = [], [], 0.0
+    for reading in readings:
+        xs.append(reading.recorded_at.timestamp())
+        current = value(reading)
+        last = current if current is not None else last
+        ys.append(last)
+    return [readings[i] for i in lttb_indices(xs, ys, limit)]
+
+
 @app.route('/api/yolink/device/<device_id>/history', methods=['GET'])
 @login_required
 def get_device_history(device_id):
@@ -1504,17 +2511,20 @@ def get_device_history(device_id):
 
     since = datetime.utcnow() - timedelta(hours=hours)
 
-    readings = SensorReading.query.filter(
-        SensorReading.device_id == device_id,
-        SensorReading.recorded_at > since
-    ).order_by(SensorReading.recorded_at.asc()).limit(limit).all()
+    def build():
+        # Long ranges are thinned across the whole window rather than cut off
+        # after the oldest `limit` rows
+        readings = query_readings(SensorReading, since, device_id=device_id)
+        readings = downsample_readings(readings, limit, lambda r: r.temperature)
+        return {
+            'device_id': device_id,
+            'hours': hours,
+            'count': len(readings),
+            'readings': [r.to_dict() for r in readings]
+        }
 
-    return jsonify({
-        'device_id': device_id,
-        'hours': hours,
-        'count': len(readings),
-        'readings': [r.to_dict() for r in readings]
-    })
+    etag = readings_etag(SensorReading, since, f'{hours}:{limit}', device_id=device_id)
+    return conditional_json(etag, build)
 
 
 # =============================================================================
@@ -1528,7 +2538,7 @@ def get_ecoflow_config():
     if not current_user.is_admin:
         return jsonify({'error': 'Unauthorized'}), 403
 
-    configs = EcoFlowConfig.query.all()
+    configs = EcoFlowAPI.get_all_configs()
     if configs:
         return jsonify({
             'configured': True,
@@ -1571,6 +2581,7 @@ def save_ecoflow_config():
         config.device_name = data['device_name']
 
     db.session.commit()
+    EcoFlowAPI.invalidate_config()
 
     return jsonify({'success': True, 'id': config.id, 'message': 'EcoFlow configuration saved'})
 
@@ -1590,6 +2601,7 @@ def delete_ecoflow_config(config_id):
     EcoFlowReading.query.filter_by(device_sn=config.device_sn).delete()
     db.session.delete(config)
     db.session.commit()
+    EcoFlowAPI.invalidate_config()
 
     return jsonify({'success': True, 'message': 'Device removed'})
 
@@ -1598,16 +2610,24 @@ def delete_ecoflow_config(config_id):
 @login_required
 def get_ecoflow_status():
     """Get status of all configured EcoFlow devices"""
-    configs = EcoFlowConfig.query.all()
+    configs = EcoFlowAPI.get_all_configs()
     if not configs:
         return jsonify({
             'configured': False,
             'devices': []
         })
 
+    # Query every power station with credentials concurrently
+    configured = [config for config in configs if config.access_key]
+    quotas = dict(zip(
+        (config.id for config in configured),
+        fan_out(lambda config: EcoFlowAPI.get_all_quotas(config=config), configured)
+    ))
+
     devices = []
     for config in configs:
-        if not config.access_key:
+        raw_data = quotas.get(config.id)
+        if raw_data is None:
             devices.append({
                 'id': config.id,
                 'configured': False,
@@ -1617,8 +2637,6 @@ def get_ecoflow_status():
             })
             continue
 
-        raw_data = EcoFlowAPI.get_all_quotas(config=config)
-
         if 'error' in raw_data:
             devices.append({
                 'id': config.id,
@@ -1636,10 +2654,69 @@ def get_ecoflow_status():
         parsed['device_sn'] = config.device_sn
         devices.append(parsed)
 
-    return jsonify({
+    # The upstream status is fetched either way (and cached briefly), so the
+    # ETag only spares the client re-downloading an unchanged body
+    response = jsonify({
         'configured': True,
         'devices': devices
     })
+    response.add_etag()
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def _ecoflow_ac_command(data):
+    """AC output on/off"""
+    return 3, 'acOutCfg', {
+        'enabled': 1 if data.get('enabled', False) else 0,
+        'xboost': 1 if data.get('xboost', False) else 0,
+        'out_voltage': 4294967295,
+        'out_freq': 2
+    }
+
+
+def _ecoflow_dc_command(data):
+    """DC (USB) output on/off"""
+    return 1, 'dcOutCfg', {'enabled': 1 if data.get('enabled', False) else 0}
+
+
+def _ecoflow_charging_command(data):
+    """AC charging rates"""
+    return 3, 'acChgCfg', {
+        'fastChgWatts': data.get('fast_charge_watts', 2400),
+        'slowChgWatts': data.get('slow_charge_watts', 400),
+        'chgPauseFlag': 0
+    }
+
+
+def _ecoflow_backup_command(data):
+    """Backup reserve level"""
+    return 1, 'watthConfig', {
+        'isConfig': 0,
+        'bpPowerSoc': data.get('backup_soc', 20),
+        'minDsgSoc': 255,
+        'minChgSoc': 255
+    }
+
+
+# kind -> builder returning set_quota's (module_type, operate_type, params)
+ECOFLOW_COMMANDS = {
+    'ac': _ecoflow_ac_command,
+    'dc': _ecoflow_dc_command,
+    'charging': _ecoflow_charging_command,
+    'backup': _ecoflow_backup_command,
+}
+
+
+def ecoflow_control_config(data):
+    """The config a control request targets: device_id, else the default"""
+    return EcoFlowAPI.get_config_by_id(data.get('device_id')) if data.get('device_id') else EcoFlowAPI.get_config()
+
+
+def send_ecoflow_command(kind, data, config):
+    module_type, operate_type, params = ECOFLOW_COMMANDS[kind](data)
+    return EcoFlowAPI.set_quota(module_type=module_type, operate_type=operate_type, params=params, config=config)
 
 
 @app.route('/api/ecoflow/control/ac', methods=['POST'])
@@ -1650,23 +2727,7 @@ def control_ecoflow_ac():
         return jsonify({'error': 'Unauthorized'}), 403
 
     data = request.get_json()
-    config = EcoFlowAPI.get_config_by_id(data.get('device_id')) if data.get('device_id') else EcoFlowAPI.get_config()
-    enabled = data.get('enabled', False)
-    xboost = data.get('xboost', False)
-
-    result = EcoFlowAPI.set_quota(
-        module_type=3,
-        operate_type='acOutCfg',
-        params={
-            'enabled': 1 if enabled else 0,
-            'xboost': 1 if xboost else 0,
-            'out_voltage': 4294967295,
-            'out_freq': 2
-        },
-        config=config
-    )
-
-    return jsonify(result)
+    return jsonify(send_ecoflow_command('ac', data, ecoflow_control_config(data)))
 
 
 @app.route('/api/ecoflow/control/dc', methods=['POST'])
@@ -1677,17 +2738,7 @@ def control_ecoflow_dc():
         return jsonify({'error': 'Unauthorized'}), 403
 
     data = request.get_json()
-    config = EcoFlowAPI.get_config_by_id(data.get('device_id')) if data.get('device_id') else EcoFlowAPI.get_config()
-    enabled = data.get('enabled', False)
-
-    result = EcoFlowAPI.set_quota(
-        module_type=1,
-        operate_type='dcOutCfg',
-        params={'enabled': 1 if enabled else 0},
-        config=config
-    )
-
-    return jsonify(result)
+    return jsonify(send_ecoflow_command('dc', data, ecoflow_control_config(data)))
 
 
 @app.route('/api/ecoflow/control/charging', methods=['POST'])
@@ -1698,20 +2749,7 @@ def control_ecoflow_charging():
         return jsonify({'error': 'Unauthorized'}), 403
 
     data = request.get_json()
-    config = EcoFlowAPI.get_config_by_id(data.get('device_id')) if data.get('device_id') else EcoFlowAPI.get_config()
-
-    result = EcoFlowAPI.set_quota(
-        module_type=3,
-        operate_type='acChgCfg',
-        params={
-            'fastChgWatts': data.get('fast_charge_watts', 2400),
-            'slowChgWatts': data.get('slow_charge_watts', 400),
-            'chgPauseFlag': 0
-        },
-        config=config
-    )
-
-    return jsonify(result)
+    return jsonify(send_ecoflow_command('charging', data, ecoflow_control_config(data)))
 
 
 @app.route('/api/ecoflow/control/backup', methods=['POST'])
@@ -1722,45 +2760,316 @@ def control_ecoflow_backup():
         return jsonify({'error': 'Unauthorized'}), 403
 
     data = request.get_json()
-    config = EcoFlowAPI.get_config_by_id(data.get('device_id')) if data.get('device_id') else EcoFlowAPI.get_config()
-    backup_soc = data.get('backup_soc', 20)
-
-    result = EcoFlowAPI.set_quota(
-        module_type=1,
-        operate_type='watthConfig',
-        params={
-            'isConfig': 0,
-            'bpPowerSoc': backup_soc,
-            'minDsgSoc': 255,
-            'minChgSoc': 255
-        },
-        config=config
+    return jsonify(send_ecoflow_command('backup', data, ecoflow_control_config(data)))
+
+
+@app.route('/api/ecoflow/control/batch', methods=['POST'])
+@login_required
+def control_ecoflow_batch():
+    """Apply several settings to one device in a single request.
+
+    Body: {device_id, commands: [{kind: 'ac'|'dc'|'charging'|'backup', ...}]},
+    each command taking the same fields as its single endpoint. The config is
+    looked up once and the commands are sent concurrently.
+    """
+    if not current_user.is_admin:
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    data = request.get_json() or {}
+    commands = data.get('commands')
+    if not isinstance(commands, list) or not commands:
+        return jsonify({'success': False, 'error': 'commands must be a non-empty list'}), 400
+    unknown = [c.get('kind') if isinstance(c, dict) else c for c in commands
+               if not isinstance(c, dict) or c.get('kind') not in ECOFLOW_COMMANDS]
+    if unknown:
+        return jsonify({'success': False, 'error': f'Unknown command kind: {unknown}'}), 400
+
+    config = ecoflow_control_config(data)
+    results = fan_out(lambda command: send_ecoflow_command(command['kind'], command, config), commands)
+
+    return jsonify({
+        'success': all('error' not in result and str(result.get('code', '0')) == '0' for result in results),
+        'results': [{'kind': command['kind'], 'result': result} for command, result in zip(commands, results)]
+    })
+
+
+@app.route('/api/ecoflow/history', methods=['GET'])
+@login_required
+def get_ecoflow_history():
+    """Get historical EcoFlow readings, optionally for one device_sn"""
+    hours = request.args.get('hours', 24, type=int)
+    limit = request.args.get('limit', 500, type=int)
+
+    hours = min(hours, 168)  # Max 1 week
+    limit = min(limit, 1000)
+
+    since = datetime.utcnow() - timedelta(hours=hours)
+
+    # Optional per-device filter, served by ix_ecoflow_device_time
+    filters = {}
+    if request.args.get('device_sn'):
+        filters['device_sn'] = request.args['device_sn']
+
+    def build():
+        readings = query_readings(EcoFlowReading, since, **filters)
+        # Without a device_sn the rows interleave devices, so thin each one's
+        # SoC series separately rather than treating the jumps between them as peaks
+        readings = downsample_readings(readings, limit, lambda r: r.soc, group=lambda r: r.device_sn)
+        return {
+            'hours': hours,
+            'count': len(readings),
+            'readings': [r.to_dict() for r in readings]
+        }
+
+    etag = readings_etag(EcoFlowReading, since, f'{hours}:{limit}', **filters)
+    return conditional_json(etag, build)
+
+
+# Report styles are immutable, so build them once at import instead of per request
+if PDF_AVAILABLE:
+    PDF_STYLES = getSampleStyleSheet()
+
+    PDF_TITLE_STYLE = ParagraphStyle(
+        'CustomTitle',
+        parent=PDF_STYLES['Heading1'],
+        fontSize=24,
+        spaceAfter=6,
+        alignment=TA_CENTER,
+        textColor=colors.HexColor('#8B4513')
+    )
+
+    PDF_SUBTITLE_STYLE = ParagraphStyle(
+        'CustomSubtitle',
+        parent=PDF_STYLES['Normal'],
+        fontSize=14,
+        spaceAfter=20,
+        alignment=TA_CENTER,
+        textColor=colors.HexColor('#666666')
+    )
+
+    PDF_HEADING_STYLE = ParagraphStyle(
+        'CustomHeading',
+        parent=PDF_STYLES['Heading2'],
+        fontSize=14,
+        spaceBefore=20,
+        spaceAfter=10,
+        textColor=colors.HexColor('#8B4513')
     )
 
-    return jsonify(result)
+    PDF_NORMAL_STYLE = ParagraphStyle(
+        'CustomNormal',
+        parent=PDF_STYLES['Normal'],
+        fontSize=10,
+        spaceAfter=6
+    )
+
+    PDF_FOOTER_STYLE = ParagraphStyle(
+        'Footer',
+        parent=PDF_STYLES['Normal'],
+        fontSize=8,
+        alignment=TA_CENTER,
+        textColor=colors.gray
+    )
+
+    PDF_STATS_TABLE_STYLE = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#8B4513')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+        ('TOPPADDING', (0, 0), (-1, 0), 8),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#FFF8DC')),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#D2B48C')),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ])
+
+    PDF_READINGS_TABLE_STYLE = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#D2691E')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 6),
+        ('TOPPADDING', (0, 0), (-1, 0), 6),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#FFFAF0')),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#DEB887')),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.HexColor('#FFFAF0'), colors.HexColor('#FFF8DC')]),
+    ])
+
+
+FDA_REPORT_CACHE_TIMEOUT = 300  # seconds
+FDA_GRAPH_POINTS = 500  # Max plotted points per sensor; each is a time bucket
+FDA_SAMPLE_SIZE = 20  # Most recent readings listed per sensor
+FDA_COMPLIANCE_TEXT = """This report documents temperature monitoring data collected from sensors
+    installed at 3 Strands Cattle Co. facilities. Temperature readings are automatically recorded
+    and stored to ensure compliance with FDA Food Safety Modernization Act (FSMA) requirements
+    for cold chain monitoring and documentation."""
+
+
+def format_temp_dual(temp_c):
+    """Format temperature showing both Celsius and Fahrenheit"""
+    if temp_c is None:
+        return "N/A"
+    temp_f = (temp_c * 9/5) + 32
+    return f"{temp_c:.1f}°C / {temp_f:.1f}°F"
+
+
+def _min_or(a, b):
+    return b if a is None else a if b is None else min(a, b)
+
+
+def _max_or(a, b):
+    return b if a is None else a if b is None else max(a, b)
+
+
+# One figure per thread, cleared between sensors. A bare Figure isn't
+# tracked by pyplot, so it needs no close() on any exit path.
+_graph_figures = threading.local()
+
+
+def render_device_graph(device_name, series):
+    """PNG bytes of one sensor's temperature graph from its (dt, avg, min, max) buckets"""
+    graph_fig = getattr(_graph_figures, 'figure', None)
+    if graph_fig is None:
+        graph_fig = _graph_figures.figure = Figure(figsize=(7, 3), dpi=100)
+    graph_fig.clear()
+    ax = graph_fig.add_subplot()
+
+    # One point per time bucket: the average, with the
+    # bucket's min-max range shaded so excursions stay visible
+    dates = [point[0] for point in series]
+    # Columns: avg, min, max in °C - converted to °F in one vector op
+    bucket_c = np.array([point[1:] for point in series], dtype=np.float64)
+    temps_c = bucket_c[:, 0]
+    temps_f, lows_f, highs_f = (bucket_c * 9 / 5 + 32).T
+
+    # Plot both C and F on dual axes
+    ax.fill_between(dates, lows_f, highs_f, color='#ff6b6b', alpha=0.2, linewidth=0)
+    ax.plot(dates, temps_f, color='#ff6b6b', linewidth=1.5, label='°F', marker='o', markersize=2)
+    ax.set_ylabel('Temperature (°F)', color='#ff6b6b')
+    ax.tick_params(axis='y', labelcolor='#ff6b6b')
+
+    # Secondary axis for Celsius
+    ax2 = ax.twinx()
+    ax2.plot(dates, temps_c, color='#00d4ff', linewidth=1.5, label='°C', linestyle='--')
+    ax2.set_ylabel('Temperature (°C)', color='#00d4ff')
+    ax2.tick_params(axis='y', labelcolor='#00d4ff')
 
+    # Formatting
+    ax.set_xlabel('Date/Time')
+    ax.set_title(f'{device_name} - Temperature Over Time', fontsize=10, fontweight='bold')
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%m/%d %H:%M'))
+    ax.xaxis.set_major_locator(mdates.AutoDateLocator())
+    ax.tick_params(axis='x', labelsize=8)
+    graph_fig.autofmt_xdate(rotation=45, ha='right')
+    ax.grid(True, alpha=0.3)
 
-@app.route('/api/ecoflow/history', methods=['GET'])
-@login_required
-def get_ecoflow_history():
-    """Get historical EcoFlow readings"""
-    hours = request.args.get('hours', 24, type=int)
-    limit = request.args.get('limit', 500, type=int)
+    # Add legend
+    lines1, labels1 = ax.get_legend_handles_labels()
+    lines2, labels2 = ax2.get_legend_handles_labels()
+    ax.legend(lines1 + lines2, labels1 + labels2, loc='upper right', fontsize=8)
 
-    hours = min(hours, 168)  # Max 1 week
-    limit = min(limit, 1000)
+    # tight_layout already fits the labels inside the figure, so
+    # savefig skips the extra draw pass bbox_inches='tight' costs
+    graph_fig.tight_layout()
 
-    since = datetime.utcnow() - timedelta(hours=hours)
+    graph_buffer = io.BytesIO()
+    graph_fig.savefig(graph_buffer, format='png', facecolor='white')
+    return graph_buffer.getvalue()
 
-    readings = EcoFlowReading.query.filter(
-        EcoFlowReading.recorded_at > since
-    ).order_by(EcoFlowReading.recorded_at.asc()).limit(limit).all()
 
-    return jsonify({
-        'hours': hours,
-        'count': len(readings),
-        'readings': [r.to_dict() for r in readings]
-    })
+def fda_report_devices(since, days):
+    """Per-sensor statistics, graph series and recent readings for the FDA report.
+
+    Min/max/avg and the graph buckets are aggregated by SQLite, so a year-long
+    report never pulls every reading into Python. Returns a dict keyed by
+    device name, in device name order.
+    """
+    bucket_seconds = max(60, days * 86400 // FDA_GRAPH_POINTS)
+
+    def where(stmt, table):
+        return stmt.where(table.c.recorded_at > since, table.c.device_type == 'THSensor')
+
+    def stats(table):
+        temp = table.c.temperature_deci
+        return where(select(
+            table.c.device_name, db.func.min(table.c.device_id), db.func.count(),
+            db.func.count(temp), db.func.min(temp), db.func.max(temp), db.func.sum(temp),
+            db.func.min(table.c.recorded_at), db.func.max(table.c.recorded_at)
+        ), table).group_by(table.c.device_name)
+
+    def series(table):
+        temp = table.c.temperature_deci
+        # julianday() is a plain float, where strftime('%s') formats a string
+        # for every row before the cast; 2440587.5 is the Unix epoch
+        bucket = db.cast((db.func.julianday(table.c.recorded_at) - 2440587.5) * (86400.0 / bucket_seconds), db.Integer)
+        return where(select(
+            table.c.device_name, bucket, db.func.min(temp), db.func.max(temp),
+            db.func.sum(temp), db.func.count(temp)
+        ), table).where(temp.isnot(None)).group_by(table.c.device_name, bucket)
+
+    def sample(table):
+        # Only the columns the readings table prints, as plain tuples
+        rank = db.func.row_number().over(
+            partition_by=table.c.device_name, order_by=table.c.recorded_at.desc()
+        ).label('rank')
+        ranked = where(select(
+            table.c.device_name, table.c.recorded_at, table.c.temperature_deci, table.c.humidity_deci, rank
+        ), table).subquery()
+        return select(
+            ranked.c.device_name, ranked.c.recorded_at, ranked.c.temperature_deci, ranked.c.humidity_deci
+        ).where(ranked.c.rank <= FDA_SAMPLE_SIZE)
+
+    # Each archive month yields its own partial aggregates; fold them together
+    devices = {}
+    rows, _ = execute_on_readings(SensorReading, since, stats)
+    for name, device_id, count, temp_count, temp_min, temp_max, temp_sum, first, last in rows:
+        device = devices.setdefault(name, {
+            'device_id': device_id, 'count': 0, 'temp_count': 0, 'temp_sum': 0,
+            'temp_min': None, 'temp_max': None, 'first': first, 'last': last,
+            'buckets': {}, 'sample': []
+        })
+        device['count'] += count
+        device['temp_count'] += temp_count
+        device['temp_sum'] += temp_sum or 0
+        device['temp_min'] = _min_or(device['temp_min'], temp_min)
+        device['temp_max'] = _max_or(device['temp_max'], temp_max)
+        device['first'] = min(device['first'], first)
+        device['last'] = max(device['last'], last)
+
+    rows, _ = execute_on_readings(SensorReading, since, series)
+    for name, bucket, temp_min, temp_max, temp_sum, temp_count in rows:
+        totals = devices[name]['buckets'].setdefault(bucket, [None, None, 0, 0])
+        totals[0] = _min_or(totals[0], temp_min)
+        totals[1] = _max_or(totals[1], temp_max)
+        totals[2] += temp_sum
+        totals[3] += temp_count
+
+    rows, _ = execute_on_readings(SensorReading, since, sample)
+    for name, recorded_at, temperature_deci, humidity_deci in rows:
+        devices[name]['sample'].append((
+            recorded_at,
+            temperature_deci / 10.0 if temperature_deci is not None else None,
+            humidity_deci / 10.0 if humidity_deci is not None else None
+        ))
+
+    epoch = datetime(1970, 1, 1)
+    for device in devices.values():
+        # Temperatures are stored in tenths of a degree Celsius
+        if device['temp_count']:
+            device['temp_min'] /= 10.0
+            device['temp_max'] /= 10.0
+            device['temp_avg'] = device['temp_sum'] / device['temp_count'] / 10.0
+        device['series'] = [
+            (epoch + timedelta(seconds=(bucket + 0.5) * bucket_seconds),
+             temp_sum / temp_count / 10.0, temp_min / 10.0, temp_max / 10.0)
+            for bucket, (temp_min, temp_max, temp_sum, temp_count) in sorted(device.pop('buckets').items())
+        ]
+        device['sample'] = sorted(device['sample'], key=lambda r: r[0])[-FDA_SAMPLE_SIZE:]
+
+    # SQLite sorts NULL names first; keep that order
+    return {name: devices[name] for name in sorted(devices, key=lambda n: (n is not None, n or ''))}
 
 
 @app.route('/api/reports/fda-temperature', methods=['GET'])
@@ -1774,25 +3083,35 @@ def generate_fda_report():
     days = request.args.get('days', 7, type=int)
     days = min(days, 365)  # Max 1 year
 
+    # Re-downloads reuse the last render until a new reading arrives. The key
+    # includes the user because the report lists the generator's contact info.
+    cached = cache_key = None
+    if cache is not None:
+        latest_id = db.session.query(db.func.max(SensorReading.id)).scalar()
+        cache_key = f'fda_report:{current_user.id}:{days}:{latest_id}'
+        cached = cache.get(cache_key)
+    if cached is None:
+        buffer, filename = render_fda_report(days)
+        if cache_key:
+            cache.set(cache_key, (buffer.getvalue(), filename), timeout=FDA_REPORT_CACHE_TIMEOUT)
+    else:
+        pdf, filename = cached
+        buffer = io.BytesIO(pdf)  # shares the cached bytes, no copy
+
+    # send_file streams the buffer through wsgi.file_wrapper in blocks and
+    # sets Content-Length, rather than materialising another bytes copy
+    return send_file(buffer, mimetype='application/pdf', as_attachment=True,
+                     download_name=filename, max_age=0)
+
+
+def render_fda_report(days):
+    """Build the FDA report for the last days as (rewound BytesIO, filename)"""
     since = datetime.utcnow() - timedelta(days=days)
     end_date = datetime.utcnow()
 
-    # Get only temperature sensor readings (THSensor)
-    readings = SensorReading.query.filter(
-        SensorReading.recorded_at > since,
-        SensorReading.device_type == 'THSensor'
-    ).order_by(SensorReading.device_name, SensorReading.recorded_at).all()
-
-    # Group readings by device
-    devices = {}
-    for reading in readings:
-        if reading.device_name not in devices:
-            devices[reading.device_name] = {
-                'readings': [],
-                'device_id': reading.device_id,
-                'device_type': reading.device_type
-            }
-        devices[reading.device_name]['readings'].append(reading)
+    # Only temperature sensors (THSensor), summarized per device
+    devices = fda_report_devices(since, days)
+    total_readings = sum(device['count'] for device in devices.values())
 
     # Create PDF in memory
     buffer = io.BytesIO()
@@ -1807,43 +3126,6 @@ def generate_fda_report():
 
     # Build the document
     story = []
-    styles = getSampleStyleSheet()
-
-    # Custom styles
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        spaceAfter=6,
-        alignment=TA_CENTER,
-        textColor=colors.HexColor('#8B4513')
-    )
-
-    subtitle_style = ParagraphStyle(
-        'CustomSubtitle',
-        parent=styles['Normal'],
-        fontSize=14,
-        spaceAfter=20,
-        alignment=TA_CENTER,
-        textColor=colors.HexColor('#666666')
-    )
-
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=14,
-        spaceBefore=20,
-        spaceAfter=10,
-        textColor=colors.HexColor('#8B4513')
-    )
-
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontSize=10,
-        spaceAfter=6
-    )
-
     # Check for logo
     logo_path = os.path.join(app.static_folder, 'logo.png')
     if os.path.exists(logo_path):
@@ -1856,203 +3138,102 @@ def generate_fda_report():
             pass
 
     # Header
-    story.append(Paragraph("3 STRANDS CATTLE CO.", title_style))
-    story.append(Paragraph("FDA Temperature Monitoring Compliance Report", subtitle_style))
+    story.append(Paragraph("3 STRANDS CATTLE CO.", PDF_TITLE_STYLE))
+    story.append(Paragraph("FDA Temperature Monitoring Compliance Report", PDF_SUBTITLE_STYLE))
 
     # Report info
     report_date = datetime.now().strftime('%B %d, %Y at %I:%M %p')
-    story.append(Paragraph(f"<b>Report Generated:</b> {report_date}", normal_style))
-    story.append(Paragraph(f"<b>Generated By:</b> {current_user.full_name}", normal_style))
+    story.append(Paragraph(f"<b>Report Generated:</b> {report_date}", PDF_NORMAL_STYLE))
+    story.append(Paragraph(f"<b>Generated By:</b> {current_user.full_name}", PDF_NORMAL_STYLE))
     if current_user.email:
-        story.append(Paragraph(f"<b>Contact Email:</b> {current_user.email}", normal_style))
+        story.append(Paragraph(f"<b>Contact Email:</b> {current_user.email}", PDF_NORMAL_STYLE))
     if current_user.phone:
-        story.append(Paragraph(f"<b>Contact Phone:</b> {current_user.phone}", normal_style))
-    story.append(Paragraph(f"<b>Report Period:</b> {since.strftime('%B %d, %Y')} - {end_date.strftime('%B %d, %Y')} ({days} days)", normal_style))
-    story.append(Paragraph(f"<b>Total Readings:</b> {len(readings)}", normal_style))
-    story.append(Paragraph(f"<b>Temperature Sensors:</b> {len(devices)}", normal_style))
+        story.append(Paragraph(f"<b>Contact Phone:</b> {current_user.phone}", PDF_NORMAL_STYLE))
+    story.append(Paragraph(f"<b>Report Period:</b> {since.strftime('%B %d, %Y')} - {end_date.strftime('%B %d, %Y')} ({days} days)", PDF_NORMAL_STYLE))
+    story.append(Paragraph(f"<b>Total Readings:</b> {total_readings}", PDF_NORMAL_STYLE))
+    story.append(Paragraph(f"<b>Temperature Sensors:</b> {len(devices)}", PDF_NORMAL_STYLE))
     story.append(Spacer(1, 0.25*inch))
 
     # Compliance statement
-    story.append(Paragraph("COMPLIANCE STATEMENT", heading_style))
-    compliance_text = """This report documents temperature monitoring data collected from sensors
-    installed at 3 Strands Cattle Co. facilities. Temperature readings are automatically recorded
-    and stored to ensure compliance with FDA Food Safety Modernization Act (FSMA) requirements
-    for cold chain monitoring and documentation."""
-    story.append(Paragraph(compliance_text, normal_style))
+    story.append(Paragraph("COMPLIANCE STATEMENT", PDF_HEADING_STYLE))
+    story.append(Paragraph(FDA_COMPLIANCE_TEXT, PDF_NORMAL_STYLE))
     story.append(Spacer(1, 0.25*inch))
 
-    # Helper function to format temperature in both C and F
-    def format_temp_dual(temp_c):
-        """Format temperature showing both Celsius and Fahrenheit"""
-        if temp_c is None:
-            return "N/A"
-        temp_f = (temp_c * 9/5) + 32
-        return f"{temp_c:.1f}°C / {temp_f:.1f}°F"
-
-    # Try to import matplotlib for graphs
-    try:
-        import matplotlib
-        matplotlib.use('Agg')  # Non-interactive backend
-        import matplotlib.pyplot as plt
-        import matplotlib.dates as mdates
-        GRAPHS_AVAILABLE = True
-    except ImportError:
-        GRAPHS_AVAILABLE = False
-
     # Device summaries
     for device_name, device_data in devices.items():
-        device_readings = device_data['readings']
-
-        if not device_readings:
+        if not device_data['count']:
             continue
 
-        story.append(Paragraph(f"SENSOR: {device_name.upper()}", heading_style))
+        story.append(Paragraph(f"SENSOR: {device_name.upper()}", PDF_HEADING_STYLE))
 
         # Calculate statistics (temperatures stored in Celsius)
-        temps = [r.temperature for r in device_readings if r.temperature is not None]
-        if temps:
-            min_temp = min(temps)
-            max_temp = max(temps)
-            avg_temp = sum(temps) / len(temps)
+        if device_data['temp_count']:
+            min_temp = device_data['temp_min']
+            max_temp = device_data['temp_max']
+            avg_temp = device_data['temp_avg']
 
             stats_data = [
                 ['Statistic', 'Value'],
                 ['Device ID', device_data['device_id']],
                 ['Device Type', 'Temperature Sensor'],
-                ['Total Readings', str(len(device_readings))],
-                ['First Reading', device_readings[0].recorded_at.strftime('%Y-%m-%d %H:%M:%S UTC')],
-                ['Last Reading', device_readings[-1].recorded_at.strftime('%Y-%m-%d %H:%M:%S UTC')],
+                ['Total Readings', str(device_data['count'])],
+                ['First Reading', device_data['first'].strftime('%Y-%m-%d %H:%M:%S UTC')],
+                ['Last Reading', device_data['last'].strftime('%Y-%m-%d %H:%M:%S UTC')],
                 ['Minimum Temperature', format_temp_dual(min_temp)],
                 ['Maximum Temperature', format_temp_dual(max_temp)],
                 ['Average Temperature', format_temp_dual(avg_temp)],
             ]
 
             stats_table = Table(stats_data, colWidths=[2.5*inch, 4*inch])
-            stats_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#8B4513')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-                ('TOPPADDING', (0, 0), (-1, 0), 8),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#FFF8DC')),
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#D2B48C')),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ]))
+            stats_table.setStyle(PDF_STATS_TABLE_STYLE)
             story.append(stats_table)
 
             # Generate temperature graph if matplotlib is available
-            if GRAPHS_AVAILABLE and len(device_readings) > 1:
+            if GRAPHS_AVAILABLE and device_data['temp_count'] and device_data['count'] > 1:
                 story.append(Spacer(1, 0.2*inch))
-                story.append(Paragraph("<b>Temperature History Graph</b>", normal_style))
+                story.append(Paragraph("<b>Temperature History Graph</b>", PDF_NORMAL_STYLE))
 
                 try:
-                    # Create the graph
-                    fig, ax = plt.subplots(figsize=(7, 3), dpi=100)
-
-                    dates = [r.recorded_at for r in device_readings if r.temperature is not None]
-                    temps_c = [r.temperature for r in device_readings if r.temperature is not None]
-                    temps_f = [(t * 9/5) + 32 for t in temps_c]
-
-                    # Plot both C and F on dual axes
-                    ax.plot(dates, temps_f, color='#ff6b6b', linewidth=1.5, label='°F', marker='o', markersize=2)
-                    ax.set_ylabel('Temperature (°F)', color='#ff6b6b')
-                    ax.tick_params(axis='y', labelcolor='#ff6b6b')
-
-                    # Secondary axis for Celsius
-                    ax2 = ax.twinx()
-                    ax2.plot(dates, temps_c, color='#00d4ff', linewidth=1.5, label='°C', linestyle='--')
-                    ax2.set_ylabel('Temperature (°C)', color='#00d4ff')
-                    ax2.tick_params(axis='y', labelcolor='#00d4ff')
-
-                    # Formatting
-                    ax.set_xlabel('Date/Time')
-                    ax.set_title(f'{device_name} - Temperature Over Time', fontsize=10, fontweight='bold')
-                    ax.xaxis.set_major_formatter(mdates.DateFormatter('%m/%d %H:%M'))
-                    ax.xaxis.set_major_locator(mdates.AutoDateLocator())
-                    plt.xticks(rotation=45, ha='right', fontsize=8)
-                    ax.grid(True, alpha=0.3)
-
-                    # Add legend
-                    lines1, labels1 = ax.get_legend_handles_labels()
-                    lines2, labels2 = ax2.get_legend_handles_labels()
-                    ax.legend(lines1 + lines2, labels1 + labels2, loc='upper right', fontsize=8)
-
-                    plt.tight_layout()
-
-                    # Save to buffer
-                    graph_buffer = io.BytesIO()
-                    plt.savefig(graph_buffer, format='png', bbox_inches='tight', facecolor='white')
-                    plt.close(fig)
-                    graph_buffer.seek(0)
-
+                    graph_png = render_device_graph(device_name, device_data['series'])
                     # Add graph to PDF
-                    graph_img = Image(graph_buffer, width=6.5*inch, height=2.5*inch)
+                    graph_img = Image(io.BytesIO(graph_png), width=6.5*inch, height=2.5*inch)
                     story.append(graph_img)
                 except Exception as e:
-                    story.append(Paragraph(f"<i>Graph generation failed: {str(e)}</i>", normal_style))
+                    story.append(Paragraph(f"<i>Graph generation failed: {str(e)}</i>", PDF_NORMAL_STYLE))
 
         # Sample of readings (last 20)
         story.append(Spacer(1, 0.15*inch))
-        story.append(Paragraph("<b>Recent Temperature Readings (Sample)</b>", normal_style))
+        story.append(Paragraph("<b>Recent Temperature Readings (Sample)</b>", PDF_NORMAL_STYLE))
 
-        sample_readings = device_readings[-20:] if len(device_readings) > 20 else device_readings
+        sample_readings = device_data['sample']
         readings_data = [['Date/Time (UTC)', 'Temperature', 'Humidity']]
 
-        for reading in sample_readings:
-            temp_str = format_temp_dual(reading.temperature)
-            humidity_str = f"{reading.humidity}%" if reading.humidity and reading.humidity > 0 else "N/A"
+        for recorded_at, temperature, humidity in sample_readings:
+            temp_str = format_temp_dual(temperature)
+            humidity_str = f"{humidity}%" if humidity and humidity > 0 else "N/A"
             readings_data.append([
-                reading.recorded_at.strftime('%Y-%m-%d %H:%M'),
+                recorded_at.strftime('%Y-%m-%d %H:%M'),
                 temp_str,
                 humidity_str
             ])
 
         readings_table = Table(readings_data, colWidths=[2*inch, 2.5*inch, 2*inch])
-        readings_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#D2691E')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 6),
-            ('TOPPADDING', (0, 0), (-1, 0), 6),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#FFFAF0')),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#DEB887')),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.HexColor('#FFFAF0'), colors.HexColor('#FFF8DC')]),
-        ]))
+        readings_table.setStyle(PDF_READINGS_TABLE_STYLE)
         story.append(readings_table)
         story.append(Spacer(1, 0.25*inch))
 
     # Footer
     story.append(Spacer(1, 0.5*inch))
-    footer_style = ParagraphStyle(
-        'Footer',
-        parent=styles['Normal'],
-        fontSize=8,
-        alignment=TA_CENTER,
-        textColor=colors.gray
-    )
-    story.append(Paragraph("─" * 80, footer_style))
-    story.append(Paragraph("This report was automatically generated by 3 Strands Cattle Co. Command Center", footer_style))
-    story.append(Paragraph("For questions regarding this report, please contact the generator listed above.", footer_style))
+    story.append(Paragraph("─" * 80, PDF_FOOTER_STYLE))
+    story.append(Paragraph("This report was automatically generated by 3 Strands Cattle Co. Command Center", PDF_FOOTER_STYLE))
+    story.append(Paragraph("For questions regarding this report, please contact the generator listed above.", PDF_FOOTER_STYLE))
 
     # Build the PDF
     doc.build(story)
 
-    # Return PDF
-    buffer.seek(0)
     filename = f"FDA_Temperature_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-
-    return Response(
-        buffer.getvalue(),
-        mimetype='application/pdf',
-        headers={
-            'Content-Disposition': f'attachment; filename={filename}',
-            'Content-Type': 'application/pdf'
-        }
-    )
+    buffer.seek(0)
+    return buffer, filename
 
 
 # =============================================================================
@@ -2062,7 +3243,7 @@ def generate_fda_report():
 import subprocess
 
 
-def is_running_in_docker():
+def _detect_docker():
     """Detect if running inside a Docker container"""
     # Check for .dockerenv file
     if os.path.exists('/.dockerenv'):
@@ -2076,31 +3257,40 @@ def is_running_in_docker():
     return False
 
 
+# A process can't move in or out of a container, so check once at import
+IN_DOCKER = _detect_docker()
+
+
+def is_running_in_docker():
+    return IN_DOCKER
+
+
 def get_git_version():
-    """Get current git commit info"""
-    in_docker = is_running_in_docker()
+    """Get current git commit info.
 
-    try:
-        # Get short commit hash
-        commit_hash = subprocess.check_output(
-            ['git', 'rev-parse', '--short', 'HEAD'],
-            cwd=os.path.dirname(os.path.abspath(__file__)),
-            stderr=subprocess.DEVNULL
-        ).decode('utf-8').strip()
+    HEAD only moves on a pull, which goes through apply_update (clearing
+    this cache) or update.sh (restarting the container), so the single
+    `git log` subprocess runs once per process rather than on every
+    /api/version.
+    """
+    return dict(_git_version())
 
-        # Get commit date
-        commit_date = subprocess.check_output(
-            ['git', 'log', '-1', '--format=%ci'],
-            cwd=os.path.dirname(os.path.abspath(__file__)),
-            stderr=subprocess.DEVNULL
-        ).decode('utf-8').strip()
 
-        # Get branch name
-        branch = subprocess.check_output(
-            ['git', 'rev-parse', '--abbrev-ref', 'HEAD'],
+@lru_cache(maxsize=1)
+def _git_version():
+    in_docker = is_running_in_docker()
+
+    try:
+        # Hash, date and ref names from one git process. %D starts with
+        # "HEAD -> <branch>" on a branch and is plain "HEAD" when detached,
+        # matching what rev-parse --abbrev-ref HEAD prints
+        commit_hash, commit_date, refs = subprocess.check_output(
+            ['git', 'log', '-1', '--format=%h%n%ci%n%D', 'HEAD'],
             cwd=os.path.dirname(os.path.abspath(__file__)),
             stderr=subprocess.DEVNULL
-        ).decode('utf-8').strip()
+        ).decode('utf-8').split('\n')[:3]
+        head = refs.split(', ')[0]
+        branch = head[len('HEAD -> '):] if head.startswith('HEAD -> ') else 'HEAD'
 
         return {
             'commit': commit_hash,
@@ -2127,6 +3317,12 @@ def get_version():
     return jsonify(get_git_version())
 
 
+# Skip the remote round trip when the last fetch is at least this recent
+UPDATE_FETCH_TTL = 60
+# Pending commits listed in the update check; the clients don't render more
+UPDATE_PENDING_COMMITS_MAX = 200
+
+
 @app.route('/api/updates/check', methods=['GET'])
 @login_required
 def check_for_updates():
@@ -2137,25 +3333,25 @@ def check_for_updates():
     try:
         app_dir = os.path.dirname(os.path.abspath(__file__))
 
-        # Fetch latest from remote
-        subprocess.run(
-            ['git', 'fetch', 'origin'],
-            cwd=app_dir,
-            capture_output=True,
-            timeout=30
-        )
-
-        # Get current commit
-        current = subprocess.check_output(
-            ['git', 'rev-parse', 'HEAD'],
+        # Current commit and branch from a single rev-parse
+        current, branch = subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD', '--abbrev-ref', 'HEAD'],
             cwd=app_dir
-        ).decode('utf-8').strip()
+        ).decode('utf-8').split()
 
-        # Get current branch
-        branch = subprocess.check_output(
-            ['git', 'rev-parse', '--abbrev-ref', 'HEAD'],
-            cwd=app_dir
-        ).decode('utf-8').strip()
+        # Fetch just this branch from remote, unless FETCH_HEAD shows we just did
+        fetch_head = os.path.join(app_dir, '.git', 'FETCH_HEAD')
+        try:
+            fetch_fresh = time.time() - os.path.getmtime(fetch_head) < UPDATE_FETCH_TTL
+        except OSError:
+            fetch_fresh = False
+        if not fetch_fresh:
+            subprocess.run(
+                ['git', 'fetch', '--no-tags', 'origin', branch],
+                cwd=app_dir,
+                capture_output=True,
+                timeout=30
+            )
 
         # Get remote commit
         remote = subprocess.check_output(
@@ -2163,26 +3359,29 @@ def check_for_updates():
             cwd=app_dir
         ).decode('utf-8').strip()
 
-        # Check if behind
-        behind_count = subprocess.check_output(
-            ['git', 'rev-list', '--count', f'HEAD..origin/{branch}'],
-            cwd=app_dir
-        ).decode('utf-8').strip()
-
-        # Get commit messages for pending updates
+        # Pending commits (and how far behind we are) only when the tips differ
         pending_commits = []
-        if int(behind_count) > 0:
-            log_output = subprocess.check_output(
+        behind_count = 0
+        if current != remote:
+            # Stream the log: count every line, keep only what the UI shows
+            with subprocess.Popen(
                 ['git', 'log', '--oneline', f'HEAD..origin/{branch}'],
-                cwd=app_dir
-            ).decode('utf-8').strip()
-            pending_commits = log_output.split('\n') if log_output else []
+                cwd=app_dir,
+                stdout=subprocess.PIPE,
+                text=True
+            ) as proc:
+                for line in proc.stdout:
+                    if behind_count < UPDATE_PENDING_COMMITS_MAX:
+                        pending_commits.append(line.rstrip('\n'))
+                    behind_count += 1
+            if proc.returncode:
+                raise subprocess.CalledProcessError(proc.returncode, proc.args)
 
         return jsonify({
             'update_available': current != remote,
             'current_commit': current[:7],
             'remote_commit': remote[:7],
-            'behind_count': int(behind_count),
+            'behind_count': behind_count,
             'branch': branch,
             'pending_commits': pending_commits
         })
@@ -2217,6 +3416,7 @@ def apply_update():
             }), 500
 
         # Get new version info
+        _git_version.cache_clear()
         new_version = get_git_version()
 
         return jsonify({
@@ -2236,6 +3436,155 @@ def apply_update():
 # APNs Push Notifications
 # =============================================================================
 
+# Max concurrent in-flight pushes per platform
+PUSH_MAX_WORKERS = int(os.environ.get('PUSH_MAX_WORKERS', '10'))
+
+
+def latest_device_tokens(platform, *conditions):
+    """Active tokens for platform matching conditions, one per device.
+
+    A phone that re-registers gets a new token row, so only its most recently
+    seen one is kept (rows without a device_id count as their own device).
+    The dedupe runs in SQLite as a window function rather than over every
+    row in Python.
+    """
+    device = db.func.coalesce(db.func.nullif(DeviceToken.device_id, ''), DeviceToken.token)
+    rank = db.func.row_number().over(
+        partition_by=device,
+        order_by=(DeviceToken.last_seen.desc(), DeviceToken.id)
+    ).label('rank')
+    ranked = select(DeviceToken.id, rank).where(
+        DeviceToken.is_active.is_(True), DeviceToken.platform == platform, *conditions
+    ).subquery()
+    return (DeviceToken.query.join(ranked, ranked.c.id == DeviceToken.id)
+            .filter(ranked.c.rank == 1).order_by(DeviceToken.id).all())
+
+
+def update_device_tokens(deactivate_ids, env_ids=None):
+    """Apply a broadcast's token changes as one UPDATE per kind of change"""
+    if deactivate_ids:
+        db.session.execute(
+            DeviceToken.__table__.update()
+            .where(DeviceToken.id.in_(deactivate_ids))
+            .values(is_active=False)
+        )
+    for env, ids in (env_ids or {}).items():
+        db.session.execute(
+            DeviceToken.__table__.update()
+            .where(DeviceToken.id.in_(ids))
+            .values(apns_environment=env)
+        )
+    db.session.commit()
+
+
+class _ApnsTokenCache:
+    """APNs provider JWT, re-signed only when close to Apple's 1-hour limit.
+
+    Apple rejects tokens older than an hour and throttles re-signing more
+    often than every 20 minutes, so one token is shared across broadcasts.
+    """
+    LIFETIME = 55 * 60
+    REFRESH_MARGIN = 5 * 60
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._token = None
+        self._signed_for = None
+        self._expires_at = 0
+
+    def get(self, key_path, key_id, team_id):
+        signed_for = (key_path, key_id, team_id)
+        with self._lock:
+            now = time.time()
+            if self._token and self._signed_for == signed_for and self._expires_at > now + self.REFRESH_MARGIN:
+                return self._token
+
+            with open(key_path, 'r') as f:
+                auth_key = f.read()
+
+            token = pyjwt.encode({'iss': team_id, 'iat': int(now)}, auth_key,
+                                 algorithm='ES256', headers={'kid': key_id})
+            if isinstance(token, bytes):
+                token = token.decode('utf-8')
+
+            self._token = token
+            self._signed_for = signed_for
+            self._expires_at = now + self.LIFETIME
+            return token
+
+    def invalidate(self):
+        """Drop the token after APNs rejects it (403 Expired/InvalidProviderToken)"""
+        with self._lock:
+            self._token = None
+
+
+class _FcmTokenCache:
+    """FCM service-account credentials, loaded once and refreshed on expiry"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key_path = None
+        self._credentials = None
+        self._project_id = ''
+        # Token refreshes reuse one keep-alive session to oauth2.googleapis.com
+        self._transport = None
+
+    def get(self, key_path):
+        """Return (access_token, project_id from the key file)"""
+        with self._lock:
+            if self._credentials is None or self._key_path != key_path:
+                self._credentials = service_account.Credentials.from_service_account_file(
+                    key_path,
+                    scopes=['https://www.googleapis.com/auth/firebase.messaging']
+                )
+                with open(key_path, 'r') as f:
+                    self._project_id = json.load(f).get('project_id', '')
+                self._key_path = key_path
+
+            if not self._credentials.valid:
+                if self._transport is None:
+                    self._transport = google.auth.transport.requests.Request(session=requests.Session())
+                self._credentials.refresh(self._transport)
+
+            return self._credentials.token, self._project_id
+
+    def invalidate(self):
+        """Force a token refresh after FCM rejects it (401 UNAUTHENTICATED)"""
+        with self._lock:
+            if self._credentials is not None:
+                self._credentials.token = None
+
+
+_apns_token_cache = _ApnsTokenCache()
+_fcm_token_cache = _FcmTokenCache()
+
+# FCM sends reuse pooled keep-alive connections instead of a new TCP+TLS
+# handshake per device token
+_fcm_session = pooled_client(PUSH_MAX_WORKERS)
+atexit.register(_fcm_session.close)
+
+# One HTTP/2 connection per APNs host, kept open between broadcasts as Apple
+# asks, instead of a TLS handshake per push. Created on first use since it
+# needs h2, which APNS_AVAILABLE doesn't check.
+APNS_KEEPALIVE_EXPIRY = 3600  # seconds an idle APNs connection is kept
+_apns_client = None
+_apns_client_lock = threading.Lock()
+
+
+def apns_client():
+    global _apns_client
+    with _apns_client_lock:
+        if _apns_client is None:
+            _apns_client = httpx.Client(
+                http1=False, http2=True, timeout=HTTP_TIMEOUTS['apns'],
+                # httpx drops idle connections after 5s by default, which
+                # would reconnect on every broadcast anyway
+                limits=httpx.Limits(max_keepalive_connections=4, keepalive_expiry=APNS_KEEPALIVE_EXPIRY)
+            )
+            atexit.register(_apns_client.close)
+        return _apns_client
+
+
 def send_push_notification(title, body, badge=1):
     """Send push notification to all registered iOS devices via APNs HTTP/2.
 
@@ -2258,39 +3607,23 @@ def send_push_notification(title, body, badge=1):
         return {'sent': 0, 'error': f'Key file not found: {key_path}'}
 
     try:
-        with open(key_path, 'r') as f:
-            auth_key = f.read()
-
-        # Build JWT token for APNs
-        token_payload = {
-            'iss': team_id,
-            'iat': int(time.time()),
-        }
-        token = pyjwt.encode(token_payload, auth_key, algorithm='ES256', headers={'kid': key_id})
-        if isinstance(token, bytes):
-            token = token.decode('utf-8')
+        # Provider JWT is cached and only re-signed every ~55 minutes
+        token = _apns_token_cache.get(key_path, key_id, team_id)
 
         PROD_HOST = 'https://api.push.apple.com'
         SANDBOX_HOST = 'https://api.sandbox.push.apple.com'
 
-        # Get all active device tokens (filter to valid APNs hex tokens only)
         # Valid APNs tokens are exactly 64 hex characters (32 bytes)
-        all_tokens = DeviceToken.query.filter_by(is_active=True, platform='ios').all()
-        valid = [d for d in all_tokens if d.token and len(d.token) == 64
-                 and all(c in '0123456789abcdef' for c in d.token.lower())]
-
-        # Deduplicate: keep only one record per device_id (most recently seen)
-        seen_devices = {}
-        tokens = []
-        for d in valid:
-            key = d.device_id or d.token  # fall back to token if no device_id
-            if key not in seen_devices or (d.last_seen and d.last_seen > seen_devices[key].last_seen):
-                seen_devices[key] = d
-        tokens = list(seen_devices.values())
+        total_devices = DeviceToken.query.filter_by(is_active=True, platform='ios').count()
+        tokens = latest_device_tokens(
+            'ios',
+            db.func.length(DeviceToken.token) == 64,
+            ~db.func.lower(DeviceToken.token).op('GLOB')('*[^0-9a-f]*')
+        )
         if not tokens:
-            msg = f"No valid APNs tokens ({len(all_tokens)} total devices)"
+            msg = f"No valid APNs tokens ({total_devices} total devices)"
             print(msg)
-            return {'sent': 0, 'total_devices': len(all_tokens), 'valid_tokens': 0, 'error': msg}
+            return {'sent': 0, 'total_devices': total_devices, 'valid_tokens': 0, 'error': msg}
 
         notification = {
             'aps': {
@@ -2302,61 +3635,90 @@ def send_push_notification(title, body, badge=1):
             }
         }
 
-        sent = 0
-        errors = []
-        with httpx.Client(http1=False, http2=True) as client:
-            for device in tokens:
-                try:
-                    headers = {
-                        'authorization': f'bearer {token}',
-                        'apns-topic': bundle_id,
-                        'apns-push-type': 'alert',
-                        'apns-priority': '10',
-                        'apns-expiration': '0',  # Immediate delivery, no retry
-                    }
-
-                    # Use the environment the device registered with
-                    env = getattr(device, 'apns_environment', 'production') or 'production'
-                    host = SANDBOX_HOST if env == 'sandbox' else PROD_HOST
-                    url = f"{host}/3/device/{device.token}"
-
-                    print(f"APNs [{env}] sending to {device.token[:12]}...")
-                    resp = client.post(url, json=notification, headers=headers)
-                    print(f"APNs [{env}] {resp.status_code} for {device.token[:12]}...")
-
-                    if resp.status_code == 200:
-                        sent += 1
-                        continue
-
-                    # If wrong environment, try the other one
-                    err_body = resp.text
-                    if resp.status_code == 400 and 'BadDeviceToken' in err_body:
-                        alt_env = 'sandbox' if env == 'production' else 'production'
-                        alt_host = SANDBOX_HOST if alt_env == 'sandbox' else PROD_HOST
-                        print(f"  BadDeviceToken, trying {alt_env}...")
-                        url = f"{alt_host}/3/device/{device.token}"
-                        resp = client.post(url, json=notification, headers=headers)
-                        print(f"  {alt_env}: {resp.status_code}")
-
-                        if resp.status_code == 200:
-                            # Update device's environment for future pushes
-                            device.apns_environment = alt_env
-                            sent += 1
-                            continue
-                        err_body = resp.text
-
-                    print(f"APNs FAILED for {device.token[:12]}...: {resp.status_code} {err_body}")
-                    errors.append(f"{device.token[:12]}: {resp.status_code} {err_body}")
-                    if resp.status_code in (400, 410):
-                        device.is_active = False
+        # Every device gets the same payload, so encode it once for the batch
+        payload = json_bytes(notification)
 
-                except Exception as e:
-                    print(f"Failed to send to {device.token[:12]}...: {e}")
-                    errors.append(str(e))
+        headers = {
+            'authorization': f'bearer {token}',
+            'content-type': 'application/json',
+            'apns-topic': bundle_id,
+            'apns-push-type': 'alert',
+            'apns-priority': '10',
+            'apns-expiration': '0',  # Immediate delivery, no retry
+        }
 
-        db.session.commit()
-        print(f"Push notifications sent: {sent}/{len(tokens)}")
-        result = {'sent': sent, 'total_devices': len(all_tokens), 'valid_tokens': len(tokens)}
+        def post(client, url):
+            try:
+                return client.post(url, content=payload, headers=headers)
+            except httpx.RemoteProtocolError:
+                # APNs closed the idle connection (GOAWAY) - retry once on a new one
+                return client.post(url, content=payload, headers=headers)
+
+        def send_one(client, device_token, env):
+            """POST to one device, retrying the other environment on BadDeviceToken.
+
+            Runs on a worker thread, so it only returns results - DB updates
+            are applied by the caller.
+            """
+            host = SANDBOX_HOST if env == 'sandbox' else PROD_HOST
+            resp = post(client, f"{host}/3/device/{device_token}")
+            if resp.status_code == 200:
+                return resp.status_code, env, None
+
+            # If wrong environment, try the other one
+            err_body = resp.text
+            if resp.status_code == 400 and 'BadDeviceToken' in err_body:
+                alt_env = 'sandbox' if env == 'production' else 'production'
+                alt_host = SANDBOX_HOST if alt_env == 'sandbox' else PROD_HOST
+                resp = post(client, f"{alt_host}/3/device/{device_token}")
+                if resp.status_code == 200:
+                    return resp.status_code, alt_env, None
+                err_body = resp.text
+
+            return resp.status_code, env, err_body
+
+        # Use the environment each device registered with
+        jobs = [(d.token, getattr(d, 'apns_environment', 'production') or 'production') for d in tokens]
+
+        # HTTP/2 multiplexes the concurrent requests over a single connection
+        client = apns_client()
+        with ThreadPoolExecutor(max_workers=PUSH_MAX_WORKERS) as pool:
+            futures = [pool.submit(send_one, client, device_token, env) for device_token, env in jobs]
+
+        sent = 0
+        errors = []
+        deactivate_ids = []
+        env_ids = {}  # apns_environment -> ids of devices that answered there
+        for device, (_, env), future in zip(tokens, jobs, futures):
+            try:
+                status_code, used_env, err_body = future.result()
+            except Exception as e:
+                print(f"Failed to send to {device.token[:12]}...: {e}")
+                errors.append(str(e))
+                continue
+
+            if status_code == 200:
+                if used_env != env:
+                    # Update device's environment for future pushes
+                    env_ids.setdefault(used_env, []).append(device.id)
+                sent += 1
+                continue
+
+            print(f"APNs FAILED for {device.token[:12]}...: {status_code} {err_body}")
+            errors.append(f"{device.token[:12]}: {status_code} {err_body}")
+            if status_code == 403 and 'ProviderToken' in (err_body or ''):
+                # The cached JWT itself was refused - sign a fresh one next time
+                # rather than reusing it for the rest of its lifetime
+                _apns_token_cache.invalidate()
+            if status_code in (400, 410):
+                deactivate_ids.append(device.id)
+
+        update_device_tokens(deactivate_ids, env_ids)
+        # Only failures are logged per device; a big broadcast would
+        # otherwise serialize on thousands of stdout writes
+        switched = sum(len(ids) for ids in env_ids.values())
+        print(f"Push notifications sent: {sent}/{len(tokens)}" + (f" ({switched} switched APNs environment)" if switched else ''))
+        result = {'sent': sent, 'total_devices': total_devices, 'valid_tokens': len(tokens)}
         if errors:
             result['errors'] = errors
         return result
@@ -2381,74 +3743,58 @@ def send_fcm_notification(title, body):
         return {'sent': 0, 'error': f'FCM key file not found: {fcm_key_path}'}
 
     try:
-        # Load service account credentials
-        credentials = service_account.Credentials.from_service_account_file(
-            fcm_key_path,
-            scopes=['https://www.googleapis.com/auth/firebase.messaging']
-        )
-
-        # Get project ID from credentials if not set
-        if not fcm_project_id:
-            with open(fcm_key_path, 'r') as f:
-                key_data = json.load(f)
-                fcm_project_id = key_data.get('project_id', '')
+        # Credentials are loaded once and only refreshed when the token expires
+        access_token, key_project_id = _fcm_token_cache.get(fcm_key_path)
+        fcm_project_id = fcm_project_id or key_project_id
 
         if not fcm_project_id:
             return {'sent': 0, 'error': 'FCM project ID not found'}
 
-        # Refresh credentials to get access token
-        auth_request = google.auth.transport.requests.Request()
-        credentials.refresh(auth_request)
-        access_token = credentials.token
-
-        # Get all active Android device tokens
-        all_tokens = DeviceToken.query.filter_by(is_active=True, platform='android').all()
-
-        # Deduplicate: keep only one record per device_id (most recently seen)
-        seen_devices = {}
-        for d in all_tokens:
-            key = d.device_id or d.token
-            if key not in seen_devices or (d.last_seen and d.last_seen > seen_devices[key].last_seen):
-                seen_devices[key] = d
-        tokens = list(seen_devices.values())
+        total_devices = DeviceToken.query.filter_by(is_active=True, platform='android').count()
+        tokens = latest_device_tokens('android')
 
         if not tokens:
-            msg = f"No Android tokens ({len(all_tokens)} total devices)"
+            msg = f"No Android tokens ({total_devices} total devices)"
             print(msg)
-            return {'sent': 0, 'total_devices': len(all_tokens), 'valid_tokens': 0, 'error': msg}
+            return {'sent': 0, 'total_devices': total_devices, 'valid_tokens': 0, 'error': msg}
 
         fcm_url = f"https://fcm.googleapis.com/v1/projects/{fcm_project_id}/messages:send"
 
+        headers = {
+            'Authorization': f'Bearer {access_token}',
+            'Content-Type': 'application/json'
+        }
+
+        # Messages differ only in the token, so encode the rest once and
+        # splice each JSON-encoded token between the two halves
+        message_head = b'{"message":{"token":'
+        message_tail = b',"notification":' + json_bytes({
+            "title": title,
+            "body": body
+        }) + b',"android":' + json_bytes({
+            "priority": "high",
+            "notification": {
+                "sound": "default",
+                "channel_id": "general"
+            }
+        }) + b'}}'
+
+        def send_one(device_token):
+            """POST one FCM message. Runs on a worker thread, returns the response."""
+            message = message_head + json_bytes(device_token) + message_tail
+            return _fcm_session.post(fcm_url, headers=headers, timeout=HTTP_TIMEOUTS['fcm'],
+                                     **{POOLED_BODY_ARG: message})
+
+        with ThreadPoolExecutor(max_workers=PUSH_MAX_WORKERS) as pool:
+            futures = [pool.submit(send_one, d.token) for d in tokens]
+
         sent = 0
         errors = []
+        deactivate_ids = []
 
-        for device in tokens:
+        for device, future in zip(tokens, futures):
             try:
-                message = {
-                    "message": {
-                        "token": device.token,
-                        "notification": {
-                            "title": title,
-                            "body": body
-                        },
-                        "android": {
-                            "priority": "high",
-                            "notification": {
-                                "sound": "default",
-                                "channel_id": "general"
-                            }
-                        }
-                    }
-                }
-
-                headers = {
-                    'Authorization': f'Bearer {access_token}',
-                    'Content-Type': 'application/json'
-                }
-
-                print(f"FCM sending to {device.token[:20]}...")
-                resp = requests.post(fcm_url, json=message, headers=headers)
-                print(f"FCM {resp.status_code} for {device.token[:20]}...")
+                resp = future.result()
 
                 if resp.status_code == 200:
                     sent += 1
@@ -2457,12 +3803,17 @@ def send_fcm_notification(title, body):
                     print(f"FCM FAILED for {device.token[:20]}...: {resp.status_code} {err_body}")
                     errors.append(f"{device.token[:20]}: {resp.status_code}")
 
+                    if resp.status_code == 401:
+                        # The cached access token was refused - fetch a new one
+                        # next time instead of reusing it until it expires
+                        _fcm_token_cache.invalidate()
+
                     # Mark invalid tokens as inactive
                     if resp.status_code in (400, 404):
                         try:
                             err_data = resp.json()
                             if 'UNREGISTERED' in str(err_data) or 'INVALID_ARGUMENT' in str(err_data):
-                                device.is_active = False
+                                deactivate_ids.append(device.id)
                         except:
                             pass
 
@@ -2470,9 +3821,9 @@ def send_fcm_notification(title, body):
                 print(f"Failed to send FCM to {device.token[:20]}...: {e}")
                 errors.append(str(e))
 
-        db.session.commit()
+        update_device_tokens(deactivate_ids)
         print(f"FCM notifications sent: {sent}/{len(tokens)}")
-        result = {'sent': sent, 'total_devices': len(all_tokens), 'valid_tokens': len(tokens)}
+        result = {'sent': sent, 'total_devices': total_devices, 'valid_tokens': len(tokens)}
         if errors:
             result['errors'] = errors
         return result
@@ -2494,10 +3845,35 @@ def send_all_push_notifications(title, body, badge=1):
     }
 
 
+# Broadcasts triggered by admin saves run here so the save returns at once.
+# One worker keeps broadcasts in order and off each other's DeviceToken rows.
+_push_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='push')
+
+
+def queue_push_notifications(title, body, label='Push'):
+    """Send to all devices in the background; the result is only logged"""
+    def run():
+        with app.app_context():
+            try:
+                print(f"{label} push result: {send_all_push_notifications(title, body)}")
+            except Exception as e:
+                print(f"{label} push failed: {e}")
+            finally:
+                db.session.remove()
+
+    _push_executor.submit(run)
+    return {'queued': True}
+
+
 # =============================================================================
 # Square Catalog API Integration
 # =============================================================================
 
+SQUARE_CATALOG_PAGE_SIZE = 1000  # Square's maximum for SearchCatalogObjects
+_square_session = pooled_client(4)
+atexit.register(_square_session.close)
+
+
 class SquareAPI:
     PRODUCTION_URL = "https://connect.squareup.com/v2"
     SANDBOX_URL = "https://connect.squareupsandbox.com/v2"
@@ -2532,10 +3908,12 @@ class SquareAPI:
             items = []
             cursor = None
             while True:
-                params = {'types': 'ITEM'}
+                # /catalog/search pages up to 1000 objects, where /catalog/list
+                # stops at 100, so most catalogs arrive in one round trip
+                body = {'object_types': ['ITEM'], 'limit': SQUARE_CATALOG_PAGE_SIZE}
                 if cursor:
-                    params['cursor'] = cursor
-                resp = requests.get(f'{base_url}/catalog/list', headers=headers, params=params, timeout=15)
+                    body['cursor'] = cursor
+                resp = _square_session.post(f'{base_url}/catalog/search', headers=headers, json=body, timeout=HTTP_TIMEOUTS['square'])
                 if resp.status_code != 200:
                     print(f"Square API error: {resp.status_code} {resp.text}")
                     return None
@@ -2571,7 +3949,68 @@ class SquareAPI:
 # Public API Endpoints (No Auth Required - for Mobile App)
 # =============================================================================
 
+def cached_public(key_prefix):
+    """Cache a public list endpoint under key_prefix (no-op without Flask-Caching)"""
+    def decorator(f):
+        if not CACHE_AVAILABLE:
+            return f
+        return cache.cached(timeout=PUBLIC_CACHE_TIMEOUT, key_prefix=key_prefix)(f)
+    return decorator
+
+
+def invalidate_public_cache(*key_prefixes):
+    """Drop cached public listings after an admin change"""
+    if CACHE_AVAILABLE:
+        cache.delete_many(*key_prefixes)
+
+
+# Admin lists keyed by endpoint: (table signature, serialized body). The
+# signature is re-read on every request, so an edit made through the other
+# gunicorn worker is seen at once instead of after a cache timeout.
+_admin_list_cache = {}
+
+
+def cached_admin_list(key, model, build):
+    """JSON response for an admin list of model, re-built only when a row
+    has been added, edited (updated_at) or deleted since it was cached"""
+    signature = tuple(db.session.execute(
+        select(db.func.count(model.id), db.func.max(model.updated_at))
+    ).one())
+    cached = _admin_list_cache.get(key)
+    if cached is None or cached[0] != signature:
+        cached = (signature, json_bytes(build()))
+        _admin_list_cache[key] = cached
+    return Response(cached[1], mimetype='application/json')
+
+
+# The Square catalog changes from Square's dashboard, not ours, so it can
+# only expire; saving the Square config or an admin refresh drops it early
+SQUARE_CATALOG_CACHE_KEY = 'square_catalog'
+SQUARE_CATALOG_CACHE_TIMEOUT = 300
+# Each worker also holds the list for a minute, so back-to-back app polls
+# skip even the shared-cache round trip and concurrent misses share one fetch
+SQUARE_CATALOG_FRESH_TTL = 60
+_square_catalog_cache = _SingleFlight(SQUARE_CATALOG_FRESH_TTL)
+
+
+def load_square_catalog():
+    """Catalog items from the shared cache, else from Square (None on failure)"""
+    items = cache.get(SQUARE_CATALOG_CACHE_KEY) if CACHE_AVAILABLE else None
+    if items is None:
+        items = SquareAPI.get_catalog()
+        if items is not None and CACHE_AVAILABLE:
+            cache.set(SQUARE_CATALOG_CACHE_KEY, items, timeout=SQUARE_CATALOG_CACHE_TIMEOUT)
+    return items
+
+
+def invalidate_square_catalog():
+    """Make the next catalog request re-fetch from Square"""
+    _square_catalog_cache.invalidate(SQUARE_CATALOG_CACHE_KEY)
+    invalidate_public_cache(SQUARE_CATALOG_CACHE_KEY)
+
+
 @app.route('/api/public/flash-sales', methods=['GET'])
+@cached_public('public_flash_sales')
 def public_flash_sales():
     """Return active flash sales for the mobile app"""
     sales = AppFlashSale.query.filter_by(is_active=True).order_by(AppFlashSale.expires_at.asc()).all()
@@ -2580,14 +4019,26 @@ def public_flash_sales():
 
 @app.route('/api/public/catalog', methods=['GET'])
 def public_catalog():
-    """Return Square catalog items for the mobile app"""
-    items = SquareAPI.get_catalog()
+    """Return Square catalog items for the mobile app.
+
+    The paginated Square fetch is cached for SQUARE_CATALOG_CACHE_TIMEOUT
+    (failures aren't), and the ETag lets app cold starts skip an unchanged
+    body entirely.
+    """
+    items = _square_catalog_cache.get(SQUARE_CATALOG_CACHE_KEY, load_square_catalog,
+                                      cache_if=lambda items: items is not None)
     if items is None:
         return jsonify({'items': [], 'source': 'unavailable'})
-    return jsonify({'items': items, 'source': 'square'})
+
+    response = jsonify({'items': items, 'source': 'square'})
+    response.add_etag()
+    response.cache_control.public = True
+    response.cache_control.max_age = PUBLIC_CACHE_TIMEOUT
+    return response.make_conditional(request)
 
 
 @app.route('/api/public/events', methods=['GET'])
+@cached_public('public_events')
 def public_events():
     """Return active events for the mobile app, expanding recurring events.
 
@@ -2600,28 +4051,30 @@ def public_events():
     events = Event.query.filter_by(is_active=True).order_by(Event.start_date.asc()).all()
 
     # Expand recurring events into instances
-    all_instances = []
+    one_off = []
+    recurring = []
     now = datetime.utcnow()
     future_limit = now + timedelta(days=90)  # Show events up to 3 months out
 
     for event in events:
         if event.is_recurring and event.recurrence_rule:
-            instances = event.get_recurring_instances(from_date=now, to_date=future_limit)
-            all_instances.extend(instances)
+            recurring.append(event.get_recurring_instances(from_date=now, to_date=future_limit))
         else:
             event_dict = event.to_dict()
             # Filter out past events - use end_date if available, otherwise start_date
             event_end = event.end_date if event.end_date else event.start_date
             if event_end and event_end >= now:
-                all_instances.append(event_dict)
+                one_off.append(event_dict)
 
-    # Sort by start_date
-    all_instances.sort(key=lambda x: x['start_date'] if x['start_date'] else '')
+    # One-off events keep the query's start_date order and each event's
+    # instances come out in date order, so merge the runs instead of sorting
+    all_instances = list(heapq.merge(one_off, *recurring, key=lambda x: x['start_date'] or ''))
 
     return jsonify(all_instances)
 
 
 @app.route('/api/public/pop-up-markets', methods=['GET'])
+@cached_public('public_pop_up_markets')
 def public_pop_up_markets():
     """Return active Pop-Up Markets for the mobile app home screen.
 
@@ -2632,8 +4085,11 @@ def public_pop_up_markets():
     now = datetime.utcnow()
     # Only return Pop-Up Markets that haven't ended yet
     # Use end_date if available, otherwise fall back to start_date
-    all_popups = Event.query.filter_by(is_active=True, is_popup=True).order_by(Event.start_date.asc()).all()
-    events = [e for e in all_popups if (e.end_date or e.start_date) >= now]
+    events = Event.query.filter(
+        Event.is_active == True,
+        Event.is_popup == True,
+        db.func.coalesce(Event.end_date, Event.start_date) >= now
+    ).order_by(Event.start_date.asc()).all()
     return jsonify([{
         'id': e.id,
         'title': e.title,
@@ -2641,13 +4097,14 @@ def public_pop_up_markets():
         'address': e.location,
         'latitude': e.latitude or 0.0,
         'longitude': e.longitude or 0.0,
-        'starts_at': e.start_date.isoformat() if e.start_date else None,
-        'ends_at': e.end_date.isoformat() if e.end_date else None,
+        'starts_at': isoformat_or_none(e.start_date),
+        'ends_at': isoformat_or_none(e.end_date),
         'is_active': e.is_active,
     } for e in events])
 
 
 @app.route('/api/public/announcements', methods=['GET'])
+@cached_public('public_announcements')
 def public_announcements():
     """Return active announcements for the mobile app"""
     announcements = Announcement.query.filter_by(is_active=True).order_by(
@@ -2677,55 +4134,67 @@ def public_notifications():
         except:
             pass
 
-    notifications = []
-
-    # Get recent flash sales
-    flash_query = AppFlashSale.query.filter_by(is_active=True)
-    if since:
-        flash_query = flash_query.filter(AppFlashSale.created_at > since)
-    for sale in flash_query.order_by(AppFlashSale.created_at.desc()).limit(limit).all():
-        discount = int(((sale.original_price - sale.sale_price) / sale.original_price) * 100) if sale.original_price > 0 else 0
-        notifications.append({
-            'id': f'flash_{sale.id}',
-            'type': 'flash_sale',
-            'title': '3 Strands Flash Sale!',
-            'body': f"{sale.title} — {discount}% off! ${sale.sale_price:.2f}/lb",
-            'created_at': sale.created_at.isoformat() if sale.created_at else None,
-            'data': sale.to_dict()
-        })
-
-    # Get recent announcements
-    ann_query = Announcement.query.filter_by(is_active=True)
-    if since:
-        ann_query = ann_query.filter(Announcement.created_at > since)
-    for ann in ann_query.order_by(Announcement.created_at.desc()).limit(limit).all():
-        notifications.append({
-            'id': f'announcement_{ann.id}',
-            'type': 'announcement',
-            'title': ann.title,
-            'body': ann.message,
-            'created_at': ann.created_at.isoformat() if ann.created_at else None,
-            'data': ann.to_dict()
-        })
+    # Pick the newest `limit` rows across all three tables in one UNION ALL,
+    # then load just those - rather than `limit` of each, trimmed in Python
+    def recent(kind, model, *criteria):
+        query = select(db.literal(kind).label('kind'), model.id, model.created_at).where(
+            model.is_active.is_(True), *criteria
+        )
+        return query.where(model.created_at > since) if since else query
+
+    latest = union_all(
+        recent(0, AppFlashSale),
+        recent(1, Announcement),
+        # Only pop-up events go to the mobile app
+        recent(2, Event, Event.is_popup.is_(True)),
+    ).subquery()
+    picked = db.session.execute(
+        select(latest.c.kind, latest.c.id)
+        .order_by(latest.c.created_at.desc(), latest.c.kind, latest.c.id.desc())
+        .limit(limit)
+    ).all()
 
-    # Get recent pop-up events (only is_popup=True events go to mobile app)
-    event_query = Event.query.filter_by(is_active=True, is_popup=True)
-    if since:
-        event_query = event_query.filter(Event.created_at > since)
-    for event in event_query.order_by(Event.created_at.desc()).limit(limit).all():
-        date_str = event.start_date.strftime('%b %d') if event.start_date else ''
-        notifications.append({
-            'id': f'event_{event.id}',
-            'type': 'event',
-            'title': '3 Strands Pop-Up Market!',
-            'body': f"{event.title} — {date_str}",
-            'created_at': event.created_at.isoformat() if event.created_at else None,
-            'data': event.to_dict()
-        })
+    models = (AppFlashSale, Announcement, Event)
+    ids_by_kind = {}
+    for kind, row_id in picked:
+        ids_by_kind.setdefault(kind, []).append(row_id)
+    loaded = {
+        kind: {obj.id: obj for obj in models[kind].query.filter(models[kind].id.in_(ids))}
+        for kind, ids in ids_by_kind.items()
+    }
 
-    # Sort all by created_at descending and limit
-    notifications.sort(key=lambda x: x['created_at'] or '', reverse=True)
-    notifications = notifications[:limit]
+    notifications = []
+    for kind, row_id in picked:
+        obj = loaded[kind][row_id]
+        if kind == 0:
+            discount = int(((obj.original_price - obj.sale_price) / obj.original_price) * 100) if obj.original_price > 0 else 0
+            notifications.append({
+                'id': f'flash_{obj.id}',
+                'type': 'flash_sale',
+                'title': '3 Strands Flash Sale!',
+                'body': f"{obj.title} — {discount}% off! ${obj.sale_price:.2f}/lb",
+                'created_at': isoformat_or_none(obj.created_at),
+                'data': obj.to_dict()
+            })
+        elif kind == 1:
+            notifications.append({
+                'id': f'announcement_{obj.id}',
+                'type': 'announcement',
+                'title': obj.title,
+                'body': obj.message,
+                'created_at': isoformat_or_none(obj.created_at),
+                'data': obj.to_dict()
+            })
+        else:
+            date_str = obj.start_date.strftime('%b %d') if obj.start_date else ''
+            notifications.append({
+                'id': f'event_{obj.id}',
+                'type': 'event',
+                'title': '3 Strands Pop-Up Market!',
+                'body': f"{obj.title} — {date_str}",
+                'created_at': isoformat_or_none(obj.created_at),
+                'data': obj.to_dict()
+            })
 
     return jsonify({
         'notifications': notifications,
@@ -2753,60 +4222,29 @@ def public_register_device():
     locale = data.get('locale', '')
     timezone = data.get('timezone', '')
 
-    def update_device_info(device):
-        """Update device with latest info"""
-        device.last_seen = datetime.utcnow()
-        device.is_active = True
-        device.apns_environment = apns_environment
-        if device_name:
-            device.device_name = device_name
-        if os_version:
-            device.os_version = os_version
-        if app_version:
-            device.app_version = app_version
-        if device_model:
-            device.device_model = device_model
-        if locale:
-            device.locale = locale
-        if timezone:
-            device.timezone = timezone
-
     try:
-        # If device_id provided, find by device_id first (handles token changes)
-        if device_id:
-            existing = DeviceToken.query.filter_by(device_id=device_id).first()
-            if existing:
-                # Check if new token conflicts with a different device's record
-                conflict = DeviceToken.query.filter(
-                    DeviceToken.token == token,
-                    DeviceToken.id != existing.id
-                ).first()
-                if conflict:
-                    db.session.delete(conflict)
-
-                # Clean up any other duplicate records for this device_id
-                dupes = DeviceToken.query.filter(
-                    DeviceToken.device_id == device_id,
-                    DeviceToken.id != existing.id
-                ).all()
-                for dupe in dupes:
-                    db.session.delete(dupe)
-
-                existing.token = token
-                update_device_info(existing)
-                db.session.commit()
-                return jsonify({'success': True, 'status': 'updated'})
-
-        # Fall back to finding by token
-        existing = DeviceToken.query.filter_by(token=token).first()
-        if existing:
-            if device_id and not existing.device_id:
-                existing.device_id = device_id
-            update_device_info(existing)
-            db.session.commit()
-            return jsonify({'success': True, 'status': 'updated'})
+        # Writes only, no lookups: move the device's row to a rotated token,
+        # upsert on the token's UNIQUE index, then drop the device's leftovers
+        now = datetime.utcnow()
+        table = DeviceToken.__table__
 
-        device = DeviceToken(
+        moved = 0
+        if device_id:
+            device_row = select(db.func.min(table.c.id)).where(table.c.device_id == device_id).scalar_subquery()
+            # Another row already holding this token gives way to the device's
+            # own row (no-op when the device has no row yet: id != NULL)
+            moved = db.session.execute(
+                table.delete().where(table.c.token == token, table.c.id != device_row)
+            ).rowcount
+            # The OS rotated this device's token: keep its row (registration
+            # date, device info) under the new token
+            moved += db.session.execute(
+                table.update()
+                .where(table.c.id == device_row, ~exists().where(table.c.token == token))
+                .values(token=token)
+            ).rowcount
+
+        stmt = sqlite_insert(table).values(
             token=token,
             platform=platform,
             device_id=device_id,
@@ -2816,11 +4254,40 @@ def public_register_device():
             app_version=app_version,
             device_model=device_model,
             locale=locale,
-            timezone=timezone
+            timezone=timezone,
+            is_active=True,
+            registered_at=now,
+            last_seen=now
         )
-        db.session.add(device)
+
+        def keep_unless_sent(column):
+            """Blank fields in the request leave the stored value alone"""
+            return db.func.coalesce(db.func.nullif(stmt.excluded[column], ''), table.c[column])
+
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['token'],
+            set_={
+                'last_seen': now,
+                'is_active': True,
+                'apns_environment': stmt.excluded.apns_environment,
+                **{column: keep_unless_sent(column) for column in (
+                    'device_id', 'device_name', 'os_version', 'app_version',
+                    'device_model', 'locale', 'timezone'
+                )}
+            }
+        ).returning(table.c.registered_at)
+        # registered_at is only written on insert
+        inserted = db.session.execute(stmt).scalar() == now
+
+        replaced = 0
+        if device_id:
+            # Any other rows for this device hold tokens it no longer uses
+            replaced = db.session.execute(
+                table.delete().where(table.c.device_id == device_id, table.c.token != token)
+            ).rowcount
         db.session.commit()
-        return jsonify({'success': True, 'status': 'registered'})
+        status = 'registered' if inserted and not (moved or replaced) else 'updated'
+        return jsonify({'success': True, 'status': status})
 
     except Exception as e:
         db.session.rollback()
@@ -2838,8 +4305,9 @@ def public_register_device():
 @login_required
 def get_flash_sales():
     """Get all flash sales (admin view - includes inactive)"""
-    sales = AppFlashSale.query.order_by(AppFlashSale.created_at.desc()).all()
-    return jsonify([s.to_dict() for s in sales])
+    return cached_admin_list('flash_sales', AppFlashSale, lambda: [
+        s.to_dict() for s in AppFlashSale.query.order_by(AppFlashSale.created_at.desc())
+    ])
 
 
 @app.route('/api/flash-sales', methods=['POST'])
@@ -2879,17 +4347,18 @@ def create_flash_sale():
         sale.expires_at = datetime.utcnow() + timedelta(hours=24)
 
     db.session.commit()
+    invalidate_public_cache('public_flash_sales')
 
     # Send push notification for active sales
     push_result = None
     if sale.is_active:
         discount = int(((sale.original_price - sale.sale_price) / sale.original_price) * 100) if sale.original_price > 0 else 0
         action = "New" if not sale_id else "Updated"
-        push_result = send_all_push_notifications(
+        push_result = queue_push_notifications(
             f"3 Strands Flash Sale!",
-            f"{action}: {sale.title} — {discount}% off! ${sale.sale_price:.2f}/lb"
+            f"{action}: {sale.title} — {discount}% off! ${sale.sale_price:.2f}/lb",
+            label='Flash sale'
         )
-        print(f"Flash sale push result: {push_result}")
 
     return jsonify({'success': True, 'sale': sale.to_dict(), 'push_result': push_result})
 
@@ -2907,6 +4376,7 @@ def delete_flash_sale(sale_id):
 
     db.session.delete(sale)
     db.session.commit()
+    invalidate_public_cache('public_flash_sales')
     return jsonify({'success': True})
 
 
@@ -2922,8 +4392,9 @@ def get_announcements():
     """Get all announcements (admin view - includes inactive)"""
     if not current_user.is_admin:
         return jsonify({'error': 'Admin required'}), 403
-    announcements = Announcement.query.order_by(Announcement.created_at.desc()).all()
-    return jsonify([a.to_dict() for a in announcements])
+    return cached_admin_list('announcements', Announcement, lambda: [
+        a.to_dict() for a in Announcement.query.order_by(Announcement.created_at.desc())
+    ])
 
 
 @app.route('/api/announcements', methods=['POST'])
@@ -2945,10 +4416,10 @@ def create_announcement():
     announcement = Announcement(title=title, message=message, is_active=True)
     db.session.add(announcement)
     db.session.commit()
+    invalidate_public_cache('public_announcements')
 
     # Send push notification to all devices
-    push_result = send_all_push_notifications(title, message)
-    print(f"Announcement push result: {push_result}")
+    push_result = queue_push_notifications(title, message, label='Announcement')
 
     return jsonify({'success': True, 'announcement': announcement.to_dict(), 'push_result': push_result})
 
@@ -2969,6 +4440,7 @@ def toggle_announcement(ann_id):
         announcement.is_active = data['is_active']
 
     db.session.commit()
+    invalidate_public_cache('public_announcements')
     return jsonify({'success': True, 'announcement': announcement.to_dict()})
 
 
@@ -2985,6 +4457,7 @@ def delete_announcement(ann_id):
 
     db.session.delete(announcement)
     db.session.commit()
+    invalidate_public_cache('public_announcements')
     return jsonify({'success': True})
 
 
@@ -2998,8 +4471,9 @@ def get_events():
     """Get all events (admin view - includes inactive)"""
     if not current_user.is_admin:
         return jsonify({'error': 'Admin required'}), 403
-    events = Event.query.order_by(Event.start_date.desc()).all()
-    return jsonify([e.to_dict() for e in events])
+    return cached_admin_list('events', Event, lambda: [
+        e.to_dict() for e in Event.query.order_by(Event.start_date.desc())
+    ])
 
 
 @app.route('/api/events', methods=['POST'])
@@ -3052,16 +4526,17 @@ def create_or_update_event():
         event.recurrence_end_date = None
 
     db.session.commit()
+    invalidate_public_cache('public_events', 'public_pop_up_markets')
 
     # Send push notification for new active pop-up events only
     push_result = None
     if not event_id and event.is_active and event.is_popup:
         date_str = event.start_date.strftime('%b %d') if event.start_date else ''
-        push_result = send_all_push_notifications(
+        push_result = queue_push_notifications(
             "3 Strands Pop-Up Market!",
-            f"{event.title} — {date_str}"
+            f"{event.title} — {date_str}",
+            label='Event'
         )
-        print(f"Event push result: {push_result}")
 
     return jsonify({'success': True, 'event': event.to_dict(), 'push_result': push_result})
 
@@ -3079,6 +4554,7 @@ def delete_event(event_id):
 
     db.session.delete(event)
     db.session.commit()
+    invalidate_public_cache('public_events', 'public_pop_up_markets')
     return jsonify({'success': True})
 
 
@@ -3105,13 +4581,32 @@ def check_and_send_event_notifications():
     now_utc = datetime.utcnow()
     now_eastern = datetime.now(eastern)
 
-    # Get all active pop-up events with notifications enabled that haven't ended yet
+    # Only fetch events with a reminder due now, so a typical run reads no rows:
+    # starting within the hour, or (from 7AM Eastern) starting today in Eastern
+    due = [db.and_(
+        Event.notified_hour_before.isnot(True),
+        Event.start_date > now_utc,
+        Event.start_date <= now_utc + timedelta(hours=1)
+    )]
+    if now_eastern.hour >= 7:
+        today = now_eastern.date()
+        day_start, day_end = (
+            datetime.combine(day, datetime.min.time(), tzinfo=eastern).astimezone(ZoneInfo('UTC')).replace(tzinfo=None)
+            for day in (today, today + timedelta(days=1))
+        )
+        due.append(db.and_(
+            Event.notified_morning.isnot(True),
+            Event.start_date >= day_start,
+            Event.start_date < day_end
+        ))
+
     # Only pop-up markets get automated push notifications; regular events are calendar/map only
     events = Event.query.filter(
         Event.is_active == True,
         Event.is_popup == True,
         Event.notify == True,
-        Event.start_date >= now_utc - timedelta(hours=1)  # Include events that just started
+        Event.start_date >= now_utc - timedelta(hours=1),  # Include events that just started
+        db.or_(*due)
     ).all()
 
     notifications_sent = []
@@ -3169,25 +4664,16 @@ def check_event_notifications():
     return jsonify({'success': True, 'notifications_sent': sent})
 
 
-# Background notification checker - runs periodically when server is accessed
-_last_notification_check = None
+# Background notification checker, run by one worker every few minutes
+NOTIFICATION_CHECK_INTERVAL = 300  # seconds
+_notification_job = _ExclusiveJob('notifications', NOTIFICATION_CHECK_INTERVAL, check_and_send_event_notifications)
 
-@app.before_request
-def maybe_check_notifications():
-    """Periodically check for event notifications (every 5 minutes)."""
-    global _last_notification_check
-
-    # Only check on certain routes to avoid overhead
-    if request.endpoint not in ['dashboard', 'index', 'get_events', 'public_events']:
-        return
 
-    now = datetime.utcnow()
-    if _last_notification_check is None or (now - _last_notification_check).total_seconds() > 300:
-        _last_notification_check = now
-        try:
-            check_and_send_event_notifications()
-        except Exception as e:
-            print(f"Error checking event notifications: {e}")
+@app.before_request
+def start_background_jobs():
+    """Start this worker's background job threads on its first request."""
+    _archive_job.start()
+    _notification_job.start()
 
 
 # =============================================================================
@@ -3233,6 +4719,18 @@ def save_square_config():
         config.environment = data['environment']
 
     db.session.commit()
+    invalidate_square_catalog()
+    return jsonify({'success': True})
+
+
+@app.route('/api/square/catalog/refresh', methods=['POST'])
+@login_required
+def refresh_square_catalog():
+    """Drop the cached catalog after items are edited in Square"""
+    if not current_user.is_admin:
+        return jsonify({'error': 'Admin required'}), 403
+
+    invalidate_square_catalog()
     return jsonify({'success': True})
 
 
@@ -3250,7 +4748,7 @@ def geocode_address():
             'q': address,
             'format': 'json',
             'limit': 1
-        }, headers={'User-Agent': '3StrandsCattleCo-Dashboard/1.0'}, timeout=10)
+        }, headers={'User-Agent': '3StrandsCattleCo-Dashboard/1.0'}, timeout=HTTP_TIMEOUTS['geocode'])
         results = resp.json()
         if results:
             return jsonify({
@@ -3279,7 +4777,7 @@ def reverse_geocode():
             'lat': lat,
             'lon': lng,
             'format': 'json'
-        }, headers={'User-Agent': '3StrandsCattleCo-Dashboard/1.0'}, timeout=10)
+        }, headers={'User-Agent': '3StrandsCattleCo-Dashboard/1.0'}, timeout=HTTP_TIMEOUTS['geocode'])
         result = resp.json()
         if result and 'display_name' in result:
             return jsonify({
@@ -3332,7 +4830,17 @@ def get_registered_devices():
     if not current_user.is_admin:
         return jsonify({'error': 'Admin required'}), 403
 
-    devices = DeviceToken.query.order_by(DeviceToken.last_seen.desc()).all()
+    # Plain column rows rather than ORM instances, and only the start of
+    # each token since that's all the list shows
+    devices = db.session.execute(
+        select(
+            DeviceToken.id, DeviceToken.device_id, DeviceToken.device_name, DeviceToken.platform,
+            DeviceToken.os_version, DeviceToken.app_version, DeviceToken.device_model,
+            DeviceToken.locale, DeviceToken.timezone, DeviceToken.is_active,
+            DeviceToken.registered_at, DeviceToken.last_seen,
+            db.func.substr(DeviceToken.token, 1, 12).label('token_start')
+        ).order_by(DeviceToken.last_seen.desc())
+    ).all()
     return jsonify([{
         'id': d.id,
         'device_id': d.device_id or '',
@@ -3344,9 +4852,9 @@ def get_registered_devices():
         'locale': d.locale or '',
         'timezone': d.timezone or '',
         'is_active': d.is_active,
-        'registered_at': d.registered_at.isoformat() if d.registered_at else None,
-        'last_seen': d.last_seen.isoformat() if d.last_seen else None,
-        'token_preview': d.token[:12] + '...' if d.token else ''
+        'registered_at': json_datetime(d.registered_at),
+        'last_seen': json_datetime(d.last_seen),
+        'token_preview': d.token_start + '...' if d.token_start else ''
     } for d in devices])
 
 
@@ -3379,7 +4887,11 @@ def delete_device(device_id):
 # =============================================================================
 
 def migrate_db():
-    """Add missing columns to existing database"""
+    """Add missing columns to existing database.
+
+    Returns True if any index was created, so the caller knows the planner
+    statistics need a full refresh.
+    """
     with app.app_context():
         from sqlalchemy import inspect, text
         inspector = inspect(db.engine)
@@ -3430,6 +4942,24 @@ def migrate_db():
                         db.session.rollback()
                         print(f"Could not add column '{col_name}': {e}")
 
+        # Migrate file table
+        if 'file' in inspector.get_table_names():
+            existing_columns = [col['name'] for col in inspector.get_columns('file')]
+
+            columns_to_add = {
+                'content_hash': 'VARCHAR(64)'
+            }
+
+            for col_name, col_type in columns_to_add.items():
+                if col_name not in existing_columns:
+                    try:
+                        db.session.execute(text(f'ALTER TABLE file ADD COLUMN {col_name} {col_type}'))
+                        db.session.commit()
+                        print(f"Added column '{col_name}' to file table")
+                    except Exception as e:
+                        db.session.rollback()
+                        print(f"Could not add column '{col_name}': {e}")
+
         # Migrate event table for recurrence and notification fields
         if 'event' in inspector.get_table_names():
             existing_columns = [col['name'] for col in inspector.get_columns('event')]
@@ -3454,15 +4984,96 @@ def migrate_db():
                         db.session.rollback()
                         print(f"Could not add column '{col_name}': {e}")
 
+        # Migrate sensor readings (live table and monthly archives) from REAL
+        # temperature/humidity to integer tenths
+        def migrate_scaled_readings(conn, schema):
+            if not inspect(conn).has_table('sensor_reading', schema=schema):
+                return
+            existing_columns = [col['name'] for col in inspect(conn).get_columns('sensor_reading', schema=schema)]
+            for col_name in ('temperature', 'humidity'):
+                if col_name not in existing_columns:
+                    continue
+                try:
+                    if f'{col_name}_deci' not in existing_columns:
+                        conn.exec_driver_sql(f'ALTER TABLE {schema}.sensor_reading ADD COLUMN {col_name}_deci SMALLINT')
+                    conn.exec_driver_sql(
+                        f'UPDATE {schema}.sensor_reading SET {col_name}_deci = CAST(round({col_name} * 10) AS INTEGER) '
+                        f'WHERE {col_name} IS NOT NULL'
+                    )
+                    conn.exec_driver_sql(f'ALTER TABLE {schema}.sensor_reading DROP COLUMN {col_name}')
+                    conn.commit()
+                    print(f"Converted {schema}.sensor_reading.{col_name} to {col_name}_deci")
+                except Exception as e:
+                    conn.rollback()
+                    print(f"Could not convert {schema}.sensor_reading.{col_name}: {e}")
+
+        with db.engine.connect() as conn:
+            migrate_scaled_readings(conn, 'main')
+            for path in sorted(glob.glob(os.path.join(app.instance_path, 'readings_*.db'))):
+                conn.exec_driver_sql('ATTACH DATABASE ? AS archive', (path,))
+                try:
+                    migrate_scaled_readings(conn, 'archive')
+                finally:
+                    conn.exec_driver_sql('DETACH DATABASE archive')
+
+        # Add indexes to existing tables (create_all only indexes new tables)
+        indexes_to_add = {
+            'ix_sensor_device_time': ('sensor_reading', 'device_id, recorded_at'),
+            'ix_ecoflow_device_time': ('eco_flow_reading', 'device_sn, recorded_at'),
+            'ix_file_owner': ('file', 'owner_id'),
+            'ix_file_public_owner': ('file', 'is_public, owner_id'),
+            'ix_file_shares_user': ('file_shares', 'user_id, file_id'),
+            # email was added by ALTER TABLE above, which can't carry its UNIQUE index
+            'ix_user_email': ('user', 'email'),
+            'ix_device_token_platform_active': ('device_token', 'platform, is_active'),
+            'ix_device_token_device_id': ('device_token', 'device_id'),
+        }
+        # Single-column indexes made redundant by a composite index above
+        indexes_to_drop = ['ix_sensor_reading_device_id', 'ix_eco_flow_reading_device_sn']
+
+        indexes_added = False
+        table_names = inspector.get_table_names()
+        for index_name, (table_name, columns) in indexes_to_add.items():
+            if table_name in table_names:
+                existing_indexes = inspector.get_indexes(table_name) + inspector.get_unique_constraints(table_name)
+                existing_names = [ix['name'] for ix in existing_indexes]
+                # Skip columns a UNIQUE constraint already indexes (fresh databases)
+                covered = [', '.join(ix['column_names']) for ix in existing_indexes]
+                if index_name not in existing_names and columns not in covered:
+                    try:
+                        db.session.execute(text(f'CREATE INDEX {index_name} ON {table_name} ({columns})'))
+                        db.session.commit()
+                        indexes_added = True
+                        print(f"Added index '{index_name}' to {table_name} table")
+                    except Exception as e:
+                        db.session.rollback()
+                        print(f"Could not add index '{index_name}': {e}")
+
+        for index_name in indexes_to_drop:
+            try:
+                db.session.execute(text(f'DROP INDEX IF EXISTS {index_name}'))
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Could not drop index '{index_name}': {e}")
+
+        return indexes_added
+
 
 def init_db():
     with app.app_context():
         # Run migrations for existing databases FIRST
-        migrate_db()
+        indexes_added = migrate_db()
 
         # Then create any new tables
         db.create_all()
 
+        # Planner statistics: a full ANALYZE only when the migration just added
+        # indexes; otherwise PRAGMA optimize re-analyzes only what has gone stale
+        # rather than scanning the reading tables on every worker start
+        db.session.execute(text('ANALYZE' if indexes_added else 'PRAGMA optimize'))
+        db.session.commit()
+
         # Create default admin user if not exists
         if not User.query.filter_by(username='admin').first():
             admin = User(username='admin', is_admin=True)
@@ -620,6 +620,13 @@ function formatTimeAgo(dateString) {
     return Math.floor(seconds / 86400) + 'd ago';
 }
 
+// Format EcoFlow remaining minutes (positive = charging, negative = discharging)
+function formatRemainTime(minutes) {
+    const total = Math.abs(minutes);
+    const text = `${Math.floor(total / 60)}h ${total % 60}m`;
+    return minutes > 0 ? `${text} until full` : `${text} remaining`;
+}
+
 function renderSensors(devices) {
     const grid = document.getElementById('sensorsGrid');
     grid.innerHTML = '';
@@ -1815,7 +1822,7 @@ function createPowerStationCard(device) {
             <div class="flow-state ${stateClass}">
                 <i class="fas ${stateIcon}"></i>
                 <span>${stateText}</span>
-                ${device.remain_time_display && device.remain_time_display !== 'Calculating...' ? `<small>${device.remain_time_display}</small>` : ''}
+                ${device.remain_time ? `<small>${formatRemainTime(device.remain_time)}</small>` : ''}
             </div>
             <div class="flow-item out">
                 <i class="fas fa-arrow-up"></i>